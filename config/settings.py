@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tickets.middleware.MetricsMiddleware',
+    'tickets.middleware.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +79,18 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite is tuned for many concurrent writers (board moves):
+# - WAL lets reads proceed while one connection writes
+# - synchronous=NORMAL is durable under WAL and fsyncs far less
+# - mmap serves reads from the page cache without copies
+# - writers wait up to `timeout` seconds for the lock instead of failing
+# - transactions begin IMMEDIATE, taking the write lock up front, so a
+#   read-then-write transaction never has to upgrade its lock (which
+#   fails at once, whatever the timeout)
+# Off by default, so local runs and tests keep SQLite's defaults;
+# deployments opt in with SQLITE_PRODUCTION_MODE=1.
+SQLITE_PRODUCTION_MODE = os.environ.get("SQLITE_PRODUCTION_MODE", "0") == "1"
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -83,6 +98,64 @@ DATABASES = {
     }
 }
 
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA temp_store=MEMORY'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 10,
+}
+
+if SQLITE_PRODUCTION_MODE:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+    })
+
+# Optional read replica (tickets.routers). Analytics, exports and the
+# dashboard summary read from it; everything else stays on the primary.
+# A second SQLite file kept fresh with `manage.py refresh_replica` works
+# as a stand-in.
+REPLICA_DATABASE_PATH = os.environ.get("REPLICA_DATABASE_PATH")
+TICKETS_REPLICA_ALIAS = 'replica'
+# Upper bound on replica staleness: clients stay on the primary this long
+# after a write, and aggregates read from the replica are cached no longer
+REPLICA_MAX_LAG = 60
+
+if REPLICA_DATABASE_PATH:
+    DATABASES[TICKETS_REPLICA_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DATABASE_PATH,
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'init_command': 'PRAGMA query_only=ON', 'timeout': 10},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['tickets.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Dashboard/analytics aggregates are cached per role scope (tickets.cache),
+# and dashboard rows and board cards per ticket (tickets.fragments).
+# For several workers on one host, switch to the file-based backend:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ticketflow',
+        # The default of 300 entries is less than one page of fragments
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -127,6 +200,35 @@ LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "dashboard"
 LOGOUT_REDIRECT_URL = "login"
 
+# Dashboard ticket list (keyset pagination)
+TICKETS_PAGE_SIZE = 50
+TICKETS_MAX_PAGE_SIZE = 200
+
+# Cards rendered per board column before "Load more"
+BOARD_COLUMN_SIZE = 25
+
+# Request/SQL metrics (tickets.metrics), served at /metrics to admins or
+# to scrapers sending "Authorization: Bearer $METRICS_TOKEN"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+METRICS_SLOW_QUERY_MS = 200
+METRICS_FLUSH_SECONDS = 5
+
+# Live board/dashboard events (tickets.events): each worker reads new
+# history rows this often while it has open streams. Streams need ASGI.
+TICKETS_EVENTS_POLL_SECONDS = 1.0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Slow queries, with the view that issued them
+        'tickets.sql': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
 
 STATIC_URL = "static/"
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Ticket, Comment, TicketHistory
+from .models import ArchivedTicket, Ticket, Comment, TicketHistory
 
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
@@ -18,3 +18,9 @@ class CommentAdmin(admin.ModelAdmin):
 class TicketHistoryAdmin(admin.ModelAdmin):
     list_display = ("id", "ticket", "action", "actor", "created_at")
     list_filter = ("action",)
+
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(admin.ModelAdmin):
+    list_display = ("id", "title", "status", "created_by", "assigned_to", "closed_at", "archived_at")
+    search_fields = ("title", "description")
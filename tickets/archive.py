@@ -0,0 +1,90 @@
+"""Move CLOSED tickets out of the live tables into the archive tables.
+
+Every scan and index on Ticket, Comment and TicketHistory only has to
+cover the hot set once old closed tickets have moved. Each batch is one
+transaction: rows are copied with their original ids, the live rows are
+deleted (which also drops them from the search index), the analytics
+rollups lose their counts and delta-sync clients get tombstones. So
+dashboard, board, analytics and sync cover live tickets only; the detail
+page and the export read both.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import invalidate_scopes, scopes_for_ticket
+from .models import (
+    ArchivedComment, ArchivedTicket, ArchivedTicketHistory, Comment, Ticket,
+    TicketHistory, TicketRollup, TicketTombstone, deletes_handled_by_caller,
+)
+
+
+def archivable(before):
+    """CLOSED tickets closed before the given moment.
+
+    Tickets closed before closed_at was tracked go by their last update.
+    """
+    return Ticket.objects.filter(status="CLOSED").filter(
+        Q(closed_at__lt=before) | Q(closed_at__isnull=True, updated_at__lt=before))
+
+
+def _copy(rows, model):
+    return [model(**row) for row in rows.values(*model.COPIED_FIELDS)]
+
+
+def archive_batch(ticket_ids, before):
+    """Move these tickets, if still archivable, with their comments and history.
+
+    Returns (tickets, comments, history rows) moved.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Checked again inside the transaction: a ticket may have reopened
+        tickets = list(archivable(before).filter(id__in=ticket_ids))
+        ids = [ticket.id for ticket in tickets]
+        comments = Comment.objects.filter(ticket_id__in=ids)
+        history = TicketHistory.objects.filter(ticket_id__in=ids)
+
+        ArchivedTicket.objects.bulk_create(
+            ArchivedTicket(archived_at=now, **{
+                field: getattr(ticket, field) for field in ArchivedTicket.COPIED_FIELDS})
+            for ticket in tickets)
+        archived_comments = ArchivedComment.objects.bulk_create(
+            _copy(comments, ArchivedComment))
+        archived_history = ArchivedTicketHistory.objects.bulk_create(
+            _copy(history, ArchivedTicketHistory))
+
+        comments.delete()
+        history.delete()
+        # Counted and tombstoned below, for the whole batch at once
+        with deletes_handled_by_caller():
+            Ticket.objects.filter(id__in=ids).delete()
+
+        deltas = Counter()
+        for ticket in tickets:
+            deltas[TicketRollup.key_for(ticket)] -= 1
+        TicketRollup.apply_deltas(deltas)
+        TicketTombstone.record(
+            [(ticket.id, scopes_for_ticket(ticket)) for ticket in tickets], "ARCHIVED")
+        invalidate_scopes(set().union(*map(scopes_for_ticket, tickets)))
+
+    return len(tickets), len(archived_comments), len(archived_history)
+
+
+def archive_closed(before, batch_size=500):
+    """Archive every ticket closed before the given moment, batch by batch.
+
+    Yields the (tickets, comments, history rows) moved by each batch.
+    """
+    while True:
+        ticket_ids = list(archivable(before).order_by("id").values_list(
+            "id", flat=True)[:batch_size])
+        if not ticket_ids:
+            return
+        moved = archive_batch(ticket_ids, before)
+        if not moved[0]:
+            return
+        yield moved
@@ -0,0 +1,179 @@
+"""View benchmarks: wall time, query count and peak memory per view and role.
+
+``manage.py benchmark_views`` runs them against generated datasets of
+several sizes and saves the results as JSON. QUERY_BUDGETS declares how
+many queries each view may issue for any role at any size; the command
+fails when a view goes over, and the test suite checks the same budgets.
+
+Every measurement starts from an empty cache, so they run against a
+private local-memory cache rather than clearing the deployment's.
+"""
+
+import itertools
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.template.loader import get_template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from users.models import User
+from .fragments import TEMPLATES as FRAGMENTS, render_fragments
+from .models import Ticket
+
+
+# Includes the session and user lookups every logged-in request makes, and
+# the conditional GET validators the pages check before rendering
+QUERY_BUDGETS = {
+    "dashboard": 8,
+    "board": 10,
+    "ticket_detail": 8,
+    "analytics": 13,
+    "export_tickets": 4,
+    "api_move_ticket": 13,
+}
+
+VIEWS = tuple(QUERY_BUDGETS)
+
+ROLES = ("admin", "technician", "user")
+
+
+def pick_subjects():
+    """The busiest account of each role, and a ticket each one can open"""
+    subjects = {"admin": User.objects.filter(role="admin").order_by("id").first()}
+    for role, relation in (("technician", "tickets_assigned"),
+                           ("user", "tickets_created")):
+        subjects[role] = User.objects.filter(role=role).annotate(
+            n=Count(relation)).order_by("-n", "id").first()
+
+    scopes = {
+        "admin": Ticket.objects.all(),
+        "technician": Ticket.objects.filter(assigned_to=subjects["technician"]),
+        "user": Ticket.objects.filter(created_by=subjects["user"]),
+    }
+    tickets = {}
+    for role, scope in scopes.items():
+        tickets[role] = (scope.filter(status__in=Ticket.OPEN_STATUSES).order_by(
+            "-created_at").first() or scope.order_by("-created_at").first())
+    return subjects, tickets
+
+
+def private_cache():
+    """Swap the default cache for an empty local-memory one while active"""
+    return override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tickets-benchmark",
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    }})
+
+
+def requests_for(view, ticket):
+    """Endless (method, url, data) requests for one view"""
+    if view == "ticket_detail":
+        url = reverse(view, args=[ticket.id])
+    elif view == "api_move_ticket":
+        url = reverse(view, args=[ticket.id])
+        # Flip between two open statuses so every call is a real move
+        first = "NEW" if ticket.status == "IN_PROGRESS" else "IN_PROGRESS"
+        second = "IN_PROGRESS" if first == "NEW" else "NEW"
+        return (("post", url, {"status": status})
+                for status in itertools.cycle((first, second)))
+    else:
+        url = reverse(view)
+    return itertools.repeat(("get", url, {}))
+
+
+def send(client, request):
+    method, url, data = request
+    response = getattr(client, method)(url, data)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    if response.status_code != 200:
+        raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+    return response
+
+
+def measure(client, requests, repeat=3, memory=True):
+    """Time, queries and peak memory of a view with a cold aggregate cache"""
+    timings, queries = [], 0
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            send(client, next(requests))
+            timings.append(time.perf_counter() - started)
+        queries = max(queries, len(ctx.captured_queries))
+
+    peak = None
+    if memory:
+        # tracemalloc slows everything down, so it gets a run of its own
+        cache.clear()
+        tracemalloc.start()
+        try:
+            send(client, next(requests))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "wall_ms_median": round(statistics.median(timings) * 1000, 2),
+        "wall_ms_min": round(min(timings) * 1000, 2),
+        "queries": queries,
+        "peak_kib": round(peak / 1024, 1) if peak is not None else None,
+    }
+
+
+@private_cache()
+def run(views=VIEWS, roles=ROLES, repeat=3, memory=True):
+    """Measure every view for every role on the current database"""
+    subjects, tickets = pick_subjects()
+    results = []
+    for role in roles:
+        if subjects[role] is None or tickets[role] is None:
+            continue
+        client = Client()
+        client.force_login(subjects[role])
+        for view in views:
+            result = measure(client, requests_for(view, tickets[role]),
+                             repeat=repeat, memory=memory)
+            results.append({
+                "view": view, "role": role, **result,
+                "budget": QUERY_BUDGETS[view],
+                "over_budget": result["queries"] > QUERY_BUDGETS[view],
+            })
+    return results
+
+
+@private_cache()
+def measure_fragments(size=500, repeat=5):
+    """Render time (ms) of a page of rows and of cards: each fragment
+    rendered on its own without the cache, then with a cold and a warm one"""
+    tickets = list(Ticket.objects.select_related("created_by", "assigned_to")
+                   .order_by("-created_at")[:size])
+    results = []
+    for kind, (template_name, context, _) in FRAGMENTS.items():
+        template = get_template(template_name)
+        timings = {"uncached": [], "cold": [], "warm": []}
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for ticket in tickets:
+                template.render(context(ticket))
+            timings["uncached"].append(time.perf_counter() - started)
+
+            cache.clear()
+            for state in ("cold", "warm"):
+                started = time.perf_counter()
+                render_fragments(kind, tickets)
+                timings[state].append(time.perf_counter() - started)
+        results.append({
+            "fragment": kind, "tickets": len(tickets),
+            **{f"{state}_ms_median": round(statistics.median(values) * 1000, 2)
+               for state, values in timings.items()},
+        })
+    return results
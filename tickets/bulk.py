@@ -0,0 +1,49 @@
+"""Batch writes for commands that load many tickets at once.
+
+bulk_create() skips Model.save(), so write_tickets() does save()'s work
+for a whole batch: SLA deadlines and rollup counts. Timestamps given on
+the objects are stored as-is, even on auto_now / auto_now_add fields.
+Callers invalidate the aggregate cache once they are done.
+"""
+
+from collections import Counter
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import Comment, Ticket, TicketHistory, TicketRollup
+
+
+class AsGivenQuerySet(models.QuerySet):
+    """A queryset whose bulk_create() stores every value as given.
+
+    Its INSERTs are raw, as in loaddata, so auto_now / auto_now_add fields
+    keep the values on the objects. The fields themselves, which every
+    other save in the process shares, are left alone.
+    """
+
+    def _insert(self, *args, **kwargs):
+        kwargs["raw"] = True
+        return super()._insert(*args, **kwargs)
+
+
+def write_tickets(tickets, history=(), comments=(), batch_size=1000):
+    """Insert new tickets and the history/comment rows pointing at them.
+
+    history and comments may reference the unsaved tickets; their ids are
+    filled in once the tickets are inserted. Everything is one transaction.
+    """
+    now = timezone.now()
+    for ticket in tickets:
+        ticket.created_at = ticket.created_at or now
+        ticket.updated_at = ticket.updated_at or ticket.created_at
+        ticket.apply_sla()
+    for row in (*history, *comments):
+        row.created_at = row.created_at or row.ticket.created_at
+
+    with transaction.atomic():
+        AsGivenQuerySet(Ticket).bulk_create(tickets, batch_size=batch_size)
+        AsGivenQuerySet(TicketHistory).bulk_create(history, batch_size=batch_size)
+        AsGivenQuerySet(Comment).bulk_create(comments, batch_size=batch_size)
+        TicketRollup.apply_deltas(
+            Counter(TicketRollup.key_for(ticket) for ticket in tickets))
@@ -0,0 +1,142 @@
+"""Per-scope cache for dashboard and analytics aggregates.
+
+Every role scope ("admin", "technician:<id>", "user:<id>") has a version
+counter stored in Django's cache. Cached aggregates are keyed by that
+version, so a write only has to bump the counters of the scopes that can
+see the ticket; entries for the old version are never read again and age
+out of the backend on their own. Nothing is invalidated by guessing a TTL.
+
+Aggregates computed from a replica are kept apart from those computed
+from the primary, and only for as long as the replica may lag.
+
+Aggregates that include time-based numbers (overdue counts) also carry
+the moment they stop being true (the next SLA breach in the scope) and
+are recomputed once it has passed.
+
+Hit and miss counters are kept in memory by each worker and exported
+with its other metrics on ``/metrics``; see tickets.metrics.
+"""
+
+import hashlib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import collect, registry
+from .routers import PRIMARY, reading_replica, replica_db
+
+
+PREFIX = "tickets"
+
+# Entries are versioned, so this only bounds how long dead ones linger
+ENTRY_TIMEOUT = getattr(settings, "TICKETS_CACHE_TIMEOUT", 24 * 3600)
+
+CACHED_NAMES = ("dashboard_summary", "analytics")
+
+GLOBAL_SCOPE = "all"
+
+
+def scope_for_user(user):
+    if user.role == "admin":
+        return "admin"
+    return f"{user.role}:{user.id}"
+
+
+def scopes_for_ticket(ticket, *previous_assignee_ids):
+    """Every scope whose aggregates include this ticket"""
+    scopes = {"admin", f"user:{ticket.created_by_id}"}
+    for assignee_id in (ticket.assigned_to_id, *previous_assignee_ids):
+        if assignee_id:
+            scopes.add(f"technician:{assignee_id}")
+    return scopes
+
+
+def _version_key(scope):
+    return f"{PREFIX}:version:{scope}"
+
+
+def _new_version():
+    return uuid.uuid4().hex[:16]
+
+
+def get_version(scope):
+    """Version string for scope, combining its own version and the global one"""
+    keys = [_version_key(GLOBAL_SCOPE), _version_key(scope)]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        # A missing version restarts from a new value, never from an old one
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return ".".join(str(versions[key]) for key in keys)
+
+
+def bump(scopes):
+    # A plain set of a value nobody has seen, rather than incr(): the file
+    # backend's incr is a get and a set, so two bumps could both write n + 1
+    # and one of them would retire nothing
+    cache.set_many({_version_key(scope): _new_version() for scope in scopes}, None)
+
+
+def invalidate_all():
+    """Retire every scope at once, e.g. after a bulk import"""
+    transaction.on_commit(lambda: bump([GLOBAL_SCOPE]))
+
+
+def invalidate_scopes(scopes):
+    """Bump scopes once the write has committed"""
+    scopes = set(scopes)
+    transaction.on_commit(lambda: bump(scopes))
+
+
+def invalidate_ticket(ticket, *previous_assignee_ids):
+    """Bump the scopes that can see ticket, once the write has committed"""
+    invalidate_scopes(scopes_for_ticket(ticket, *previous_assignee_ids))
+
+
+def cached(name, user, compute, key_extra=(), valid_until=None):
+    """Return compute() for user's scope, reusing a cached result if current.
+
+    key_extra distinguishes variants of the same aggregate (e.g. the day).
+    valid_until, if given, is called with the computed value and returns
+    the datetime after which the value must be recomputed, or None.
+    """
+    scope = scope_for_user(user)
+    extra = hashlib.md5(repr(key_extra).encode()).hexdigest()[:12]
+    # Keyed by the database it is computed from, so a client pinned to the
+    # primary never gets what a lagging replica computed
+    db = replica_db() if reading_replica() else PRIMARY
+    key = f"{PREFIX}:{name}:{scope}:{db}:{get_version(scope)}:{extra}"
+
+    entry = cache.get(key)
+    if entry is not None:
+        expires_at, value = entry
+        if expires_at is None or timezone.now() < expires_at:
+            registry.count_cache(name, "hits")
+            return value
+
+    registry.count_cache(name, "misses")
+    value = compute()
+    expires_at = valid_until(value) if valid_until else None
+    if reading_replica():
+        # Computed from a replica that may lag; don't keep it past that lag
+        lag_limit = timezone.now() + timedelta(
+            seconds=getattr(settings, "REPLICA_MAX_LAG", 60))
+        expires_at = min(expires_at, lag_limit) if expires_at else lag_limit
+    cache.set(key, (expires_at, value), ENTRY_TIMEOUT)
+    return value
+
+
+def stats():
+    """{name: {"hits": n, "misses": n}} for every cached aggregate, summed
+    over the workers whose metrics snapshot this process can see"""
+    result = {name: {"hits": 0, "misses": 0} for name in CACHED_NAMES}
+    for snapshot in collect().values():
+        for name, counts in snapshot["caches"].items():
+            for outcome, count in counts.items():
+                result.setdefault(name, {"hits": 0, "misses": 0})[outcome] += count
+    return result
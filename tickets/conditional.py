@@ -0,0 +1,107 @@
+"""Conditional GET (ETag / Last-Modified / 304) for the ticket pages.
+
+Each page gets a validator that costs a few index-only queries: for a
+role scope, the newest updated_at, the ticket count, the number of
+overdue tickets and the newest tombstone (so deletes, archiving and
+reassignment count as changes); for a ticket, its updated_at and its
+newest history row. A client whose copy matches gets a 304 before the
+page's queries run or its template renders.
+
+Django's ``condition`` decorator calls its validators synchronously, which
+async views cannot do with the ORM, hence this variant.
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils import timezone
+
+from .models import Ticket, TicketTombstone
+
+
+def scope_validator(tickets, scope, now=None):
+    """(parts, last modified) for the tickets of one role scope"""
+    now = now or timezone.now()
+    # Each aggregate reads one covering index, never the table
+    changed = tickets.order_by().aggregate(
+        updated=Max("updated_at"), count=Count("id"))
+    # Going overdue changes the page too, at the moment of the breach
+    overdue = tickets.filter(Ticket.overdue_filter(now)).order_by().aggregate(
+        count=Count("id"), breached=Max("sla_due_at"))
+    removed = TicketTombstone.objects.filter(scope=scope).order_by(
+        "-id").values_list("id", "created_at").first()
+    removed_id, removed_at = removed or (None, None)
+
+    moments = [m for m in (changed["updated"], overdue["breached"], removed_at) if m]
+    parts = (changed["updated"], changed["count"], overdue["count"], removed_id)
+    return parts, max(moments) if moments else None
+
+
+def ticket_validator(ticket_model, ticket_id):
+    """(parts, last modified) for one live or archived ticket, or None"""
+    ticket = ticket_model.objects.filter(id=ticket_id).only(
+        "updated_at", "created_at", "status", "urgency", "sla_due_at",
+    ).annotate(last_event=Max("history__id")).first()
+    if ticket is None:
+        return None
+    # The page shows the age (to 1/100 hour) and the overdue flag, both clock-driven
+    parts = (ticket_model.__name__, ticket.updated_at, ticket.last_event,
+             ticket.age_in_hours, ticket.is_overdue)
+    return parts, ticket.updated_at
+
+
+def make_etag(request, user, parts):
+    """Strong ETag for one user's copy of the page at this URL.
+
+    The CSRF secret is included because the page embeds a token for it;
+    rendering the page may set it, so the ETag sent is computed after.
+    """
+    key = repr((request.get_full_path(), user.id, user.role,
+                request.META.get("CSRF_COOKIE"), parts))
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+def conditional(validator):
+    """Answer 304 for an async view when the client's copy is current.
+
+    validator(user, *args, **kwargs) runs in a worker thread and returns
+    (parts, last modified) or None to always run the view. Pages with
+    pending flash messages are always rendered, since the messages would
+    otherwise be lost.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return await view(request, *args, **kwargs)
+
+            user = await request.auser()
+            found = await sync_to_async(validator)(user, *args, **kwargs)
+            if found is None:
+                return await view(request, *args, **kwargs)
+
+            parts, modified = found
+            modified = int(modified.timestamp()) if modified else None
+            response = None
+            if not len(messages.get_messages(request)):
+                response = get_conditional_response(
+                    request, etag=make_etag(request, user, parts),
+                    last_modified=modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response.headers.setdefault("ETag", make_etag(request, user, parts))
+            if modified:
+                response.headers.setdefault("Last-Modified", http_date(modified))
+            # Revalidate every time: the validators are cheap, stale pages aren't
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
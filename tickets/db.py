@@ -0,0 +1,37 @@
+"""Database helpers for write paths that contend on SQLite's single writer lock"""
+
+import random
+import time
+from functools import wraps
+
+from django.db import OperationalError, connection, transaction
+
+
+LOCK_RETRIES = 3
+LOCK_BACKOFF = 0.05
+
+
+def is_lock_error(exc):
+    return "database is locked" in str(exc) or "database table is locked" in str(exc)
+
+
+def retry_on_lock(func):
+    """Run func in a transaction, retrying it if the database stays locked.
+
+    The busy timeout already makes writers queue for the lock; this covers
+    the rare wait that outlasts it. Retrying is only safe when func owns
+    the whole transaction, so inside an outer atomic block errors are
+    raised unchanged.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRIES + 1):
+            nested = connection.in_atomic_block
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                if nested or attempt == LOCK_RETRIES or not is_lock_error(exc):
+                    raise
+            time.sleep(LOCK_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
@@ -0,0 +1,196 @@
+"""Live ticket events for the board and the dashboard, as Server-Sent Events.
+
+Every ticket create, assignment and status change writes a TicketHistory
+row, so the history table is the event log. Each worker process runs one
+poller while it has subscribers: every POLL_SECONDS it reads the history
+rows added since the last poll (one query, whichever worker wrote them),
+renders each event's board card and dashboard row once, and hands the
+event to the queue of every open stream whose role scope can see the
+ticket. Open streams cost a queue each, not a query each.
+
+Tickets leaving a scope (reassigned away, deleted, archived) leave a
+TicketTombstone for it instead; the poller reads those too and sends the
+scope a "removed" event.
+
+A stream whose client falls QUEUE_SIZE events behind is told to reload
+instead of being buffered without bound.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import scopes_for_ticket
+from .fragments import render_fragments
+from .models import ArchivedTicket, Ticket, TicketHistory, TicketTombstone
+
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("CREATED", "ASSIGNED", "STATUS_CHANGED", "CLOSED")
+
+POLL_SECONDS = getattr(settings, "TICKETS_EVENTS_POLL_SECONDS", 1.0)
+
+KEEPALIVE_SECONDS = 15
+
+# How long a disconnected browser waits before reconnecting
+RECONNECT_MS = 3000
+
+QUEUE_SIZE = 100
+
+# Most events read per poll; a busier poll continues on the next one
+BATCH_SIZE = 500
+
+
+def ticket_event(history):
+    """The event for one history row, with the HTML its pages patch in"""
+    ticket = history.ticket
+    return {
+        "id": history.id,
+        "action": history.action,
+        "ticket_id": ticket.id,
+        "status": ticket.status,
+        "urgency": ticket.urgency,
+        "from_status": history.from_status,
+        "card": render_fragments("card", [ticket])[0],
+        "row": render_fragments("row", [ticket])[0],
+    }
+
+
+def removed_event(tombstone, ticket):
+    """The event for one tombstone; ticket is None if it was deleted"""
+    return {
+        "id": f"removed-{tombstone.id}",
+        "action": "REMOVED",
+        "reason": tombstone.reason,
+        "ticket_id": tombstone.ticket_id,
+        "status": ticket.status if ticket else None,
+        "urgency": ticket.urgency if ticket else None,
+    }
+
+
+def format_event(event):
+    name = "removed" if event["action"] == "REMOVED" else "ticket"
+    return f"id: {event['id']}\nevent: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+class Subscription:
+    """One open stream: its role scope and the events waiting to be sent"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and ask the client to reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broker:
+    """Fans history and tombstone rows out to this process's open streams"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_id = None
+        self.last_tombstone_id = None
+        self.task = None
+
+    def subscribe(self, scope):
+        subscription = Subscription(scope)
+        self.subscribers.add(subscription)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.poll())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def fetch(self):
+        """Events for the history and tombstone rows written since the last call"""
+        if self.last_id is None:
+            # Start from now; earlier history is already on the page
+            self.last_id = TicketHistory.objects.order_by("-id").values_list(
+                "id", flat=True).first() or 0
+            self.last_tombstone_id = TicketTombstone.objects.order_by(
+                "-id").values_list("id", flat=True).first() or 0
+            return []
+
+        # SQLite commits writers one at a time, so ids become visible in order
+        rows = list(
+            TicketHistory.objects.filter(id__gt=self.last_id, action__in=ACTIONS)
+            .select_related("ticket__created_by", "ticket__assigned_to")
+            .order_by("id")[:BATCH_SIZE]
+        )
+        tombstones = list(TicketTombstone.objects.filter(
+            id__gt=self.last_tombstone_id).order_by("id")[:BATCH_SIZE])
+
+        changed = [(row.created_at, ticket_event(row), scopes_for_ticket(row.ticket))
+                   for row in rows]
+        removed = self.removed(tombstones)
+        if rows:
+            self.last_id = rows[-1].id
+        if tombstones:
+            self.last_tombstone_id = tombstones[-1].id
+        # In time order, so a ticket reassigned away and back within one
+        # poll ends up on the board
+        return [(event, scopes) for _, event, scopes in heapq.merge(
+            changed, removed, key=lambda item: item[0])]
+
+    def removed(self, tombstones):
+        if not tombstones:
+            return []
+        # Where each ticket is now, for the counters the client adjusts
+        ids = {t.ticket_id for t in tombstones}
+        tickets = {**ArchivedTicket.objects.only("status", "urgency").in_bulk(ids),
+                   **Ticket.objects.only("status", "urgency").in_bulk(ids)}
+        return [(t.created_at, removed_event(t, tickets.get(t.ticket_id)), {t.scope})
+                for t in tombstones]
+
+    def publish(self, events):
+        for event, scopes in events:
+            for subscription in self.subscribers:
+                if subscription.scope in scopes:
+                    subscription.offer(event)
+
+    async def poll(self):
+        fetch = sync_to_async(self.fetch, thread_sensitive=False)
+        while self.subscribers:
+            try:
+                self.publish(await fetch())
+            except Exception:
+                # A locked or failed read: the open streams would otherwise
+                # get keepalives forever. The next poll retries from the same ids.
+                logger.exception("Polling ticket events failed")
+            await asyncio.sleep(POLL_SECONDS)
+        # Nobody is listening: the next subscriber starts from its own now
+        self.last_id = None
+
+    async def stream(self, subscription):
+        """The text/event-stream body for one subscription"""
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    yield "event: reload\ndata: {}\n\n"
+                    return
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+broker = Broker()
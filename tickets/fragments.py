@@ -0,0 +1,59 @@
+"""Per-ticket cache of the dashboard row and board card markup.
+
+A ticket's row and card only change when the ticket does, so each is
+cached under the ticket id and a digest of what the markup shows that
+can change without touching the ticket itself: updated_at, the usernames
+and the active time zone. A page fetches all of its fragments with one
+``get_many``, renders only the missing ones and stores them with one
+``set_many``. Edits bump updated_at, so stale fragments are never read
+again and age out of the backend like the other versioned entries.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .cache import ENTRY_TIMEOUT, PREFIX
+
+
+# Bump when dashboard_row.html or board_cards.html changes
+VERSION = 1
+
+# kind: (template, its context for one ticket, the people it names)
+TEMPLATES = {
+    "row": ("tickets/dashboard_row.html", lambda t: {"t": t},
+            ("created_by", "assigned_to")),
+    "card": ("tickets/board_cards.html", lambda t: {"cards": [t]},
+             ("assigned_to",)),
+}
+
+
+def fragment_key(kind, ticket):
+    usernames = [getattr(ticket, field).username
+                 if getattr(ticket, f"{field}_id") else None
+                 for field in TEMPLATES[kind][2]]
+    digest = hashlib.md5(repr((
+        ticket.updated_at, usernames, timezone.get_current_timezone_name(),
+    )).encode()).hexdigest()[:12]
+    return f"{PREFIX}:fragment:{VERSION}:{kind}:{ticket.id}:{digest}"
+
+
+def render_fragments(kind, tickets):
+    """The markup of each ticket, in order, rendering only cache misses.
+
+    The people the fragment names should be loaded with select_related.
+    """
+    template_name, context, _ = TEMPLATES[kind]
+    template = get_template(template_name)
+    keys = [fragment_key(kind, t) for t in tickets]
+    found = cache.get_many(keys)
+    missing = {}
+    for key, ticket in zip(keys, tickets):
+        if key not in found:
+            missing[key] = found[key] = str(template.render(context(ticket)))
+    if missing:
+        cache.set_many(missing, ENTRY_TIMEOUT)
+    return [mark_safe(found[key]) for key in keys]
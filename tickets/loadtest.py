@@ -0,0 +1,182 @@
+"""Concurrent HTTP load against a running server, for comparing deployments.
+
+``manage.py load_test`` logs in one account per role through the session
+table shared with the server, then has --concurrency clients issue a mix
+of board, move, detail, dashboard and analytics requests for a fixed time.
+Run it once against the WSGI deployment and once against the ASGI one
+(same database, same worker count) and compare the throughput and the
+latency of board moves while slow requests are in flight.
+"""
+
+import http.client
+import itertools
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from users.models import User
+from .models import Ticket
+
+
+# Relative frequency of each request kind
+DEFAULT_MIX = {"board": 4, "move": 4, "detail": 2, "dashboard": 2, "analytics": 1}
+
+KINDS = tuple(DEFAULT_MIX)
+
+
+def parse_mix(value):
+    """'board:4,move:2' -> {'board': 4, 'move': 2}"""
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition(":")
+        if kind not in KINDS:
+            raise ValueError(f"unknown request kind {kind!r}")
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+def login_cookies(user):
+    """Session and CSRF cookies for user, stored where the server reads them"""
+    client = Client()
+    client.force_login(user)
+    csrf_token = get_random_string(32)
+    return {
+        settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value,
+        settings.CSRF_COOKIE_NAME: csrf_token,
+    }
+
+
+class Account:
+    """A logged-in user and the tickets their requests use"""
+
+    def __init__(self, user, tickets):
+        self.user = user
+        self.tickets = tickets
+        self.cookies = login_cookies(user)
+
+    def headers(self):
+        return {
+            "Cookie": "; ".join(f"{name}={value}" for name, value in self.cookies.items()),
+            "X-CSRFToken": self.cookies[settings.CSRF_COOKIE_NAME],
+        }
+
+
+def accounts(tickets_per_account=20):
+    """One account per role, each with open tickets it may move"""
+    found = []
+    for role, field in (("admin", None), ("technician", "assigned_to"),
+                        ("user", "created_by")):
+        user = User.objects.filter(role=role).order_by("id").first()
+        if user is None:
+            continue
+        tickets = Ticket.objects.filter(status__in=Ticket.OPEN_STATUSES)
+        if field:
+            tickets = tickets.filter(**{field: user})
+        ids = list(tickets.order_by("-created_at").values_list(
+            "id", flat=True)[:tickets_per_account])
+        if ids:
+            found.append(Account(user, ids))
+    return found
+
+
+def request_for(kind, account, rng):
+    """(kind, method, path, body) for one request"""
+    if kind == "move":
+        ticket_id = rng.choice(account.tickets)
+        body = urlencode({"status": rng.choice(Ticket.OPEN_STATUSES)})
+        return kind, "POST", reverse("api_move_ticket", args=[ticket_id]), body
+    if kind == "detail":
+        return kind, "GET", reverse("ticket_detail", args=[rng.choice(account.tickets)]), None
+    return kind, "GET", reverse(kind), None
+
+
+class Worker(threading.Thread):
+    """One client with a keep-alive connection, sending until the deadline"""
+
+    def __init__(self, url, accounts, mix, deadline, seed, timeout):
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.accounts = accounts
+        self.kinds = list(itertools.chain.from_iterable(
+            itertools.repeat(kind, weight) for kind, weight in mix.items()))
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.results = []
+
+    def connect(self):
+        cls = (http.client.HTTPSConnection if self.url.scheme == "https"
+               else http.client.HTTPConnection)
+        return cls(self.url.hostname, self.url.port, timeout=self.timeout)
+
+    def run(self):
+        connection = self.connect()
+        prefix = self.url.path.rstrip("/")
+        while time.monotonic() < self.deadline:
+            account = self.rng.choice(self.accounts)
+            kind, method, path, body = request_for(
+                self.rng.choice(self.kinds), account, self.rng)
+            headers = account.headers()
+            if body is not None:
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            started = time.perf_counter()
+            try:
+                connection.request(method, prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = self.connect()
+                status = None
+            self.results.append((kind, status, time.perf_counter() - started))
+        connection.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(results, elapsed):
+    """Throughput overall and latency percentiles (ms) per request kind"""
+    summary = {
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if status is None or status >= 400),
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "kinds": {},
+    }
+    for kind in KINDS:
+        timings = sorted(seconds * 1000 for k, _, seconds in results if k == kind)
+        if not timings:
+            continue
+        summary["kinds"][kind] = {
+            "requests": len(timings),
+            "p50_ms": round(statistics.median(timings), 1),
+            "p95_ms": round(percentile(timings, 0.95), 1),
+            "p99_ms": round(percentile(timings, 0.99), 1),
+        }
+    return summary
+
+
+def run(url, mix=DEFAULT_MIX, concurrency=32, duration=10.0, seed=0, timeout=30.0):
+    found = accounts()
+    if not found:
+        raise ValueError("no accounts with open tickets to load test with")
+    deadline = time.monotonic() + duration
+    workers = [Worker(url, found, mix, deadline, seed + i, timeout)
+               for i in range(concurrency)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+    return summarize([r for worker in workers for r in worker.results], elapsed)
@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tickets.archive import archivable, archive_closed
+
+
+class Command(BaseCommand):
+    help = ("Move tickets closed more than --days ago, with their comments "
+            "and history, into the archive tables")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365,
+                            help="Archive tickets closed more than this many days ago")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Tickets moved per transaction")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only count the tickets that would be archived")
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative")
+        before = timezone.now() - timedelta(days=options["days"])
+
+        if options["dry_run"]:
+            self.stdout.write(
+                f"{archivable(before).count()} tickets closed before "
+                f"{before:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        started = time.monotonic()
+        totals = [0, 0, 0]
+        for moved in archive_closed(before, batch_size=max(1, options["batch_size"])):
+            totals = [total + n for total, n in zip(totals, moved)]
+            self.stdout.write(f"Archived {totals[0]} tickets so far")
+
+        tickets, comments, history = totals
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {tickets} tickets ({comments} comments, {history} history rows) "
+            f"in {time.monotonic() - started:.2f}s"))
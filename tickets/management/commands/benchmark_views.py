@@ -0,0 +1,113 @@
+import json
+import subprocess
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tickets import benchmark
+from tickets.models import Ticket
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the main views per role on generated datasets "
+            "(in a separate test database) and check their query budgets")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000],
+                            help="Ticket counts to benchmark, e.g. 1000 100000 1000000")
+        parser.add_argument("--views", nargs="+", choices=benchmark.VIEWS,
+                            default=list(benchmark.VIEWS))
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--no-memory", action="store_true",
+                            help="Skip the tracemalloc run of each view")
+        parser.add_argument(
+            "--fragments", type=int, default=500, metavar="N",
+            help="Also time rendering N dashboard rows and board cards "
+                 "without the fragment cache and with a cold and a warm one "
+                 "(0 to skip)")
+        parser.add_argument(
+            "--keepdb", action="store_true",
+            help="Keep the benchmark database and its data for the next run")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            results = self.benchmark(options)
+            fragments = self.benchmark_fragments(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report = {
+            "commit": current_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "results": results,
+            "fragments": fragments,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        over = [r for r in results if r["over_budget"]]
+        if over:
+            raise CommandError("Over query budget: " + ", ".join(
+                f"{r['view']} as {r['role']} at {r['size']} tickets "
+                f"({r['queries']} > {r['budget']})" for r in over))
+
+    def benchmark(self, options):
+        results = []
+        for size in sorted(options["sizes"]):
+            # Sizes grow, so each dataset tops up the previous one
+            missing = size - Ticket.objects.count()
+            if missing > 0:
+                started = time.monotonic()
+                call_command(
+                    "generate_data", tickets=missing, seed=options["seed"] + size,
+                    prefix=f"bench{size}", users=max(10, missing // 50),
+                    technicians=max(3, missing // 5000), stdout=self.stdout)
+                self.stdout.write(
+                    f"Dataset of {size} tickets ready in {time.monotonic() - started:.1f}s")
+
+            for row in benchmark.run(views=options["views"], repeat=options["repeat"],
+                                     memory=not options["no_memory"]):
+                row = {"size": size, **row}
+                results.append(row)
+                self.stdout.write(
+                    f"{size:>8} {row['view']:<16} {row['role']:<10} "
+                    f"{row['wall_ms_median']:>9.1f} ms {row['queries']:>3} queries "
+                    f"(budget {row['budget']})"
+                    + (f" {row['peak_kib']:>9.1f} KiB" if row["peak_kib"] is not None else "")
+                    + (" OVER BUDGET" if row["over_budget"] else ""))
+        return results
+
+    def benchmark_fragments(self, options):
+        if not options["fragments"]:
+            return []
+        results = benchmark.measure_fragments(options["fragments"], options["repeat"])
+        for row in results:
+            self.stdout.write(
+                f"{row['tickets']:>8} {row['fragment'] + ' fragments':<16} "
+                f"uncached {row['uncached_ms_median']:>9.1f} ms  "
+                f"cold {row['cold_ms_median']:>9.1f} ms  warm {row['warm_ms_median']:>9.1f} ms")
+        return results
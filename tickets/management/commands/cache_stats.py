@@ -0,0 +1,23 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from tickets import cache
+
+
+class Command(BaseCommand):
+    help = ("Show hit/miss counts for the dashboard and analytics caches, summed "
+            "over the workers that publish metrics to the shared cache")
+
+    def handle(self, *args, **options):
+        if isinstance(caches["default"], LocMemCache):
+            self.stderr.write(
+                "The cache is local to each process, so this command cannot see "
+                "the server's counters. Scrape /metrics "
+                "(ticketflow_cache_lookups_total) instead.")
+        for name, counts in cache.stats().items():
+            total = counts["hits"] + counts["misses"]
+            ratio = counts["hits"] / total * 100 if total else 0.0
+            self.stdout.write(
+                f"{name:<20} hits={counts['hits']:<8} "
+                f"misses={counts['misses']:<8} hit_ratio={ratio:.1f}%")
@@ -0,0 +1,183 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.bulk import write_tickets
+from tickets.cache import invalidate_all
+from tickets.models import Comment, Ticket, TicketHistory
+from users.models import User
+
+
+# Every timestamp is an offset from this instant, never from the clock
+BASE_DATE = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+STATUS_WEIGHTS = {"NEW": 12, "IN_PROGRESS": 18, "RESOLVED": 25, "CLOSED": 45}
+URGENCY_WEIGHTS = {"LOW": 35, "MEDIUM": 40, "HIGH": 20, "CRITICAL": 5}
+CATEGORY_WEIGHTS = {"HARDWARE": 25, "SOFTWARE": 25, "NETWORK": 15,
+                    "ACCESS": 15, "EMAIL": 10, "OTHER": 10}
+
+TITLES = {
+    "HARDWARE": ["Printer not working", "Laptop will not boot",
+                 "Monitor flickering", "Docking station not detected"],
+    "SOFTWARE": ["Application crashes on start", "License expired",
+                 "Update failed", "Report export is broken"],
+    "NETWORK": ["Slow connection", "VPN keeps disconnecting",
+                "No Wi-Fi on floor 3", "Cannot reach file share"],
+    "ACCESS": ["Password reset", "Need access to shared drive",
+               "Account locked", "Missing permissions on project"],
+    "EMAIL": ["Cannot send email", "Mailbox full",
+              "Calendar not syncing", "Spam reaching inbox"],
+    "OTHER": ["New employee setup", "Question about equipment",
+              "Office move", "General request"],
+}
+DESCRIPTIONS = [
+    "Started this morning and affects the whole team.",
+    "Happens intermittently, roughly once an hour.",
+    "Restarting did not help.",
+    "Blocking month-end reporting.",
+    "Error message attached in the previous ticket.",
+]
+COMMENTS = [
+    "Any update on this?",
+    "Looking into it now.",
+    "Could you send a screenshot of the error?",
+    "Workaround applied, monitoring.",
+    "Still happening after the fix.",
+    "Confirmed working on my side, thanks.",
+]
+
+
+def pick(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class Command(BaseCommand):
+    help = "Generate a reproducible synthetic dataset for capacity testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--tickets", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--technicians", type=int, default=20)
+        parser.add_argument("--admins", type=int, default=1)
+        parser.add_argument(
+            "--days", type=int, default=365,
+            help="Spread ticket creation over this many days before the base date")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="gen",
+                            help="Prefix for generated usernames")
+        parser.add_argument("--password", default="password")
+
+    def handle(self, *args, **options):
+        if min(options["users"], options["technicians"], options["admins"]) < 1:
+            raise CommandError("Need at least one user, technician and admin")
+        rng = random.Random(options["seed"])
+
+        started = time.monotonic()
+        users = self.create_users(options)
+        self.stdout.write(f"Created {sum(map(len, users.values()))} users")
+
+        batch_size = max(1, options["batch_size"])
+        span = options["days"] * 86400
+        created = 0
+        while created < options["tickets"]:
+            count = min(batch_size, options["tickets"] - created)
+            batch = ([], [], [])
+            for _ in range(count):
+                self.build(rng, users, span, *batch)
+            write_tickets(*batch, batch_size=batch_size)
+            created += count
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{created} tickets, {len(batch[1])} history rows and "
+                f"{len(batch[2])} comments in this batch, "
+                f"{created / elapsed:.0f} tickets/s")
+
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {created} tickets in {time.monotonic() - started:.2f}s "
+            f"(seed {options['seed']})"))
+
+    def create_users(self, options):
+        """Bulk-create the accounts; returns {role: [user ids]}"""
+        prefix = options["prefix"]
+        # A fixed salt keeps the hash, and so the dataset, identical per seed
+        password = make_password(options["password"], salt=f"{prefix}seed{options['seed']}")
+        names = {
+            "admin": [f"{prefix}_admin{n:03d}" for n in range(options["admins"])],
+            "technician": [f"{prefix}_tech{n:04d}" for n in range(options["technicians"])],
+            "user": [f"{prefix}_user{n:06d}" for n in range(options["users"])],
+        }
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Users with prefix {prefix!r} already exist")
+
+        User.objects.bulk_create([
+            User(username=name, password=password, role=role,
+                 email=f"{name}@example.com", date_joined=BASE_DATE)
+            for role, group in names.items() for name in group
+        ], batch_size=options["batch_size"])
+        ids = dict(User.objects.filter(
+            username__startswith=f"{prefix}_").values_list("username", "id"))
+        return {role: [ids[name] for name in group] for role, group in names.items()}
+
+    def build(self, rng, users, span, tickets, history, comments):
+        """Append one ticket with its history trail and comments"""
+        status = pick(rng, STATUS_WEIGHTS)
+        urgency = pick(rng, URGENCY_WEIGHTS)
+        category = pick(rng, CATEGORY_WEIGHTS)
+        created_by = rng.choice(users["user"])
+        created_at = BASE_DATE - timedelta(seconds=rng.randrange(span))
+
+        assigned_to = None
+        if status != "NEW" or rng.random() < 0.5:
+            assigned_to = rng.choice(users["technician"])
+
+        # Timeline: assigned, picked up, then resolved within a few SLA
+        # periods and closed up to a week later
+        assigned_at = started_at = resolved_at = closed_at = None
+        if assigned_to:
+            assigned_at = created_at + timedelta(minutes=rng.randrange(5, 240))
+        if status != "NEW":
+            started_at = assigned_at + timedelta(minutes=rng.randrange(1, 120))
+        if status in ("RESOLVED", "CLOSED"):
+            sla = Ticket.SLA_HOURS[urgency] * 3600
+            resolved_at = started_at + timedelta(
+                seconds=rng.randrange(sla // 10, sla * 5 // 2))
+        if status == "CLOSED":
+            closed_at = resolved_at + timedelta(seconds=rng.randrange(3600, 7 * 86400))
+
+        ticket = Ticket(
+            title=rng.choice(TITLES[category]),
+            description=rng.choice(DESCRIPTIONS),
+            category=category, status=status, urgency=urgency,
+            created_by_id=created_by, assigned_to_id=assigned_to,
+            created_at=created_at, resolved_at=resolved_at, closed_at=closed_at,
+            updated_at=closed_at or resolved_at or started_at or assigned_at or created_at,
+        )
+        tickets.append(ticket)
+
+        def event(actor, at, action, from_status=None, to_status=None):
+            note = "Ticket created" if action == "CREATED" else (
+                "Assigned" if action == "ASSIGNED" else "Status updated")
+            history.append(TicketHistory(
+                ticket=ticket, actor_id=actor, action=action, created_at=at,
+                from_status=from_status, to_status=to_status, note=note))
+
+        event(created_by, created_at, "CREATED", to_status="NEW")
+        if assigned_at:
+            event(rng.choice(users["admin"]), assigned_at, "ASSIGNED")
+        if started_at:
+            event(assigned_to, started_at, "STATUS_CHANGED", "NEW", "IN_PROGRESS")
+        if resolved_at:
+            event(assigned_to, resolved_at, "STATUS_CHANGED", "IN_PROGRESS", "RESOLVED")
+        if closed_at:
+            event(assigned_to, closed_at, "STATUS_CHANGED", "RESOLVED", "CLOSED")
+
+        for _ in range(rng.choice((0, 0, 1, 1, 2, 3))):
+            author = assigned_to if assigned_to and rng.random() < 0.5 else created_by
+            comments.append(Comment(
+                ticket=ticket, author_id=author, content=rng.choice(COMMENTS),
+                created_at=created_at + timedelta(seconds=rng.randrange(60, 3 * 86400))))
@@ -0,0 +1,206 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from tickets.bulk import write_tickets
+from tickets.cache import invalidate_all
+from tickets.models import Comment, Ticket, TicketHistory
+from users.models import User
+
+
+class RowError(ValueError):
+    pass
+
+
+def text(record, field, default=""):
+    value = record.get(field) or default
+    if not isinstance(value, str):
+        raise RowError(f"{field} must be a string")
+    return value
+
+
+def choice(record, field, choices, default):
+    value = text(record, field, default).strip().upper()
+    if value not in dict(choices):
+        raise RowError(f"invalid {field} {value!r}")
+    return value
+
+
+def timestamp(value):
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise RowError(f"invalid datetime {value!r}")
+    parsed = parse_datetime(value.strip())
+    if parsed is None:
+        raise RowError(f"invalid datetime {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Import tickets (with history and comments) from CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin")
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"],
+            help="Input format (default: from the file extension)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--resume-from", type=int, default=1, metavar="ROW",
+            help="First input row to import; progress lines print the value "
+                 "to resume an interrupted run with")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or (
+            "csv" if options["path"].lower().endswith(".csv") else "jsonl")
+        batch_size = max(1, options["batch_size"])
+        resume_from = options["resume_from"]
+
+        # One query for every username the input can mention
+        self.users = {
+            username: (user_id, role) for username, user_id, role
+            in User.objects.values_list("username", "id", "role")
+        }
+
+        if options["path"] == "-":
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options["path"], encoding="utf-8-sig",
+                              newline="" if fmt == "csv" else None)
+            except OSError as exc:
+                raise CommandError(exc)
+
+        started = time.monotonic()
+        imported = skipped = 0
+        batch = ([], [], [])
+        row_number = resume_from - 1
+
+        with stream:
+            for row_number, record in self.read(stream, fmt):
+                if row_number < resume_from or record is None:
+                    continue
+                try:
+                    self.build(record, *batch)
+                except RowError as exc:
+                    skipped += 1
+                    self.stderr.write(f"Row {row_number}: {exc}")
+                    continue
+                if len(batch[0]) >= batch_size:
+                    imported += self.flush(batch, batch_size)
+                    self.progress(row_number, imported, skipped, started)
+                    batch = ([], [], [])
+            imported += self.flush(batch, batch_size)
+
+        invalidate_all()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} tickets ({skipped} rows skipped) up to row "
+            f"{row_number} in {elapsed:.2f}s, "
+            f"{imported / elapsed if elapsed else 0:.0f} rows/s"))
+
+    def read(self, stream, fmt):
+        """(row number, record) pairs; rows are counted from 1"""
+        if fmt == "csv":
+            yield from enumerate(csv.DictReader(stream), 1)
+            return
+
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                yield number, None
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = "invalid JSON"
+            yield number, record
+
+    def user(self, username, role=None):
+        found = None
+        if isinstance(username, str):
+            found = self.users.get(username.strip())
+        if found is None:
+            raise RowError(f"unknown user {username!r}")
+        if role and found[1] != role:
+            raise RowError(f"{username!r} is not a {role}")
+        return found[0]
+
+    def build(self, record, tickets, history, comments):
+        """Validate one record and append its unsaved rows to the batch"""
+        if not isinstance(record, dict):
+            raise RowError(record if isinstance(record, str) else "not an object")
+
+        title = text(record, "title").strip()
+        if not title or len(title) > 150:
+            raise RowError("title must be 1 to 150 characters")
+
+        ticket = Ticket(
+            title=title,
+            description=text(record, "description"),
+            category=choice(record, "category", Ticket.CATEGORY_CHOICES, "OTHER"),
+            status=choice(record, "status", Ticket.STATUS_CHOICES, "NEW"),
+            urgency=choice(record, "urgency", Ticket.URGENCY_CHOICES, "MEDIUM"),
+            created_by_id=self.user(record.get("created_by")),
+            created_at=timestamp(record.get("created_at")),
+            resolved_at=timestamp(record.get("resolved_at")),
+            closed_at=timestamp(record.get("closed_at")),
+        )
+        if record.get("assigned_to"):
+            ticket.assigned_to_id = self.user(record["assigned_to"], "technician")
+
+        # Rows are written raw, so nothing later fills or checks these
+        if ticket.status == "RESOLVED" and not ticket.resolved_at:
+            raise RowError("RESOLVED tickets need resolved_at")
+        if ticket.status == "CLOSED" and not ticket.closed_at:
+            raise RowError("CLOSED tickets need closed_at")
+        created_at = ticket.created_at or timezone.now()
+        for field in ("resolved_at", "closed_at"):
+            value = getattr(ticket, field)
+            if value and value < created_at:
+                raise RowError(f"{field} is before created_at")
+
+        # CSV rows carry their comments as a JSON array in one column
+        items = record.get("comments") or []
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                raise RowError("comments is not valid JSON")
+        if not isinstance(items, list):
+            raise RowError("comments must be a list")
+
+        ticket_comments = []
+        for item in items:
+            if (not isinstance(item, dict) or not item.get("content")
+                    or not isinstance(item["content"], str)):
+                raise RowError("comments must be objects with content")
+            ticket_comments.append(Comment(
+                ticket=ticket, author_id=self.user(item.get("author")),
+                content=item["content"], created_at=timestamp(item.get("created_at"))))
+
+        tickets.append(ticket)
+        history.append(TicketHistory(
+            ticket=ticket, actor_id=ticket.created_by_id, action="CREATED",
+            to_status=ticket.status, note="Ticket imported"))
+        comments.extend(ticket_comments)
+
+    def flush(self, batch, batch_size):
+        tickets, history, comments = batch
+        if tickets:
+            write_tickets(tickets, history, comments, batch_size=batch_size)
+        return len(tickets)
+
+    def progress(self, row_number, imported, skipped, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Committed through row {row_number}: {imported} imported, "
+            f"{skipped} skipped, {imported / elapsed if elapsed else 0:.0f} rows/s "
+            f"(resume with --resume-from {row_number + 1})")
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets import loadtest
+
+
+class Command(BaseCommand):
+    help = ("Drive a running server with concurrent board/move/detail/dashboard/"
+            "analytics requests and report throughput and latency. Compare e.g. "
+            "'gunicorn config.wsgi -w 2 --threads 8' with "
+            "'uvicorn config.asgi:application --workers 2' on the same database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Base URL of the server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=32,
+                            help="Clients sending requests at the same time")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+        parser.add_argument(
+            "--mix", default=",".join(f"{k}:{w}" for k, w in loadtest.DEFAULT_MIX.items()),
+            help="Relative weight of each request kind, e.g. board:4,move:4,analytics:1")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the summary to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+            summary = loadtest.run(
+                options["url"], mix=mix, concurrency=max(1, options["concurrency"]),
+                duration=options["duration"], seed=options["seed"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['seconds']}s: "
+            f"{summary['requests_per_second']} req/s, {summary['errors']} errors")
+        for kind, stats in summary["kinds"].items():
+            self.stdout.write(
+                f"  {kind:<10} {stats['requests']:>7} requests  p50 {stats['p50_ms']:>8.1f} ms"
+                f"  p95 {stats['p95_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"url": options["url"], "concurrency": options["concurrency"],
+                           "mix": mix, **summary}, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
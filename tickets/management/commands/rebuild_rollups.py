@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.cache import invalidate_all
+from tickets.models import TicketRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the analytics rollup table from the Ticket table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = TicketRollup.rebuild(batch_size=options["batch_size"])
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rows} rollup rows in {time.monotonic() - started:.2f}s"))
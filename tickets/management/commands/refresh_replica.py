@@ -0,0 +1,49 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tickets.routers import PRIMARY, replica_alias
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto the replica with the backup API"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", help="Replica file (default: the replica alias' NAME)")
+        parser.add_argument(
+            "--interval", type=float,
+            help="Keep refreshing every INTERVAL seconds instead of once")
+        parser.add_argument(
+            "--pages", type=int, default=0,
+            help="Pages copied per step; 0 copies everything in one step")
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != "sqlite":
+            raise CommandError("refresh_replica only supports SQLite")
+
+        target = options["target"]
+        if target is None:
+            alias = replica_alias()
+            if alias is None:
+                raise CommandError(
+                    "No replica configured; set REPLICA_DATABASE_PATH or pass --target")
+            target = settings.DATABASES[alias]["NAME"]
+
+        while True:
+            started = time.monotonic()
+            primary.ensure_connection()
+            with closing(sqlite3.connect(target, timeout=30)) as replica:
+                # Readers of the replica see either the old or the new copy
+                primary.connection.backup(replica, pages=options["pages"] or -1)
+            self.stdout.write(
+                f"Replica {target} refreshed in {time.monotonic() - started:.2f}s")
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,173 @@
+"""In-process request, SQL and cache metrics, in Prometheus text format.
+
+Each worker process keeps its own counters in memory (a dict update under
+a lock per request). Every METRICS_FLUSH_SECONDS a worker copies its
+snapshot into Django's cache, and ``/metrics`` renders the snapshots of
+all workers found there, each labelled with its worker id. With a cache
+shared between workers (file-based, Redis, ...) one scrape sees every
+worker; with the default local-memory cache it sees the worker serving
+it.
+"""
+
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PREFIX = "tickets:metrics"
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FLUSH_SECONDS = getattr(settings, "METRICS_FLUSH_SECONDS", 5)
+
+# Snapshots of workers that stopped flushing disappear after this long
+SNAPSHOT_TIMEOUT = 10 * 60
+
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Registry:
+    """Per-view and per-cached-aggregate counters for this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.caches = {}
+        self.last_flush = 0.0
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+            self.caches.clear()
+
+    def observe(self, view, status, seconds, queries, sql_seconds, slow):
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = {
+                    "buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0,
+                    "count": 0, "statuses": {}, "queries": 0,
+                    "sql_seconds": 0.0, "slow_queries": 0,
+                }
+            stats["buckets"][bisect_left(BUCKETS, seconds)] += 1
+            stats["sum"] += seconds
+            stats["count"] += 1
+            status_class = f"{status // 100}xx"
+            stats["statuses"][status_class] = stats["statuses"].get(status_class, 0) + 1
+            stats["queries"] += queries
+            stats["sql_seconds"] += sql_seconds
+            stats["slow_queries"] += slow
+
+    def count_cache(self, name, outcome):
+        """Count a "hits" or "misses" lookup of a cached aggregate"""
+        with self.lock:
+            counts = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+    def snapshot(self):
+        with self.lock:
+            views = {view: {**stats, "buckets": list(stats["buckets"]),
+                            "statuses": dict(stats["statuses"])}
+                     for view, stats in self.views.items()}
+            caches = {name: dict(counts) for name, counts in self.caches.items()}
+        return {"views": views, "caches": caches}
+
+    def maybe_flush(self, force=False):
+        """Publish this worker's snapshot at most every FLUSH_SECONDS"""
+        now = time.monotonic()
+        if not force and now - self.last_flush < FLUSH_SECONDS:
+            return
+        self.last_flush = now
+        cache.set(f"{PREFIX}:worker:{WORKER}", self.snapshot(), SNAPSHOT_TIMEOUT)
+        workers = cache.get(f"{PREFIX}:workers") or set()
+        if WORKER not in workers:
+            cache.set(f"{PREFIX}:workers", workers | {WORKER}, None)
+
+
+registry = Registry()
+
+
+def collect():
+    """{worker: snapshot} for every worker that has published one"""
+    registry.maybe_flush(force=True)
+    workers = cache.get(f"{PREFIX}:workers") or set()
+    found = cache.get_many([f"{PREFIX}:worker:{worker}" for worker in workers])
+    snapshots = {key.rsplit(":worker:", 1)[1]: value for key, value in found.items()}
+    # Forget workers whose snapshot has expired
+    if len(snapshots) < len(workers):
+        cache.set(f"{PREFIX}:workers", set(snapshots), None)
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _bound(value):
+    return f"{value:g}"
+
+
+def render(snapshots):
+    """Prometheus text exposition of collect()'s result"""
+    families = {
+        "ticketflow_request_duration_seconds": (
+            "histogram", "Request latency by view", []),
+        "ticketflow_responses_total": (
+            "counter", "Responses by view and status class", []),
+        "ticketflow_sql_queries_total": (
+            "counter", "SQL queries issued by view", []),
+        "ticketflow_sql_duration_seconds_total": (
+            "counter", "Time spent in SQL by view", []),
+        "ticketflow_slow_queries_total": (
+            "counter", "SQL queries over the slow-query threshold by view", []),
+        "ticketflow_cache_lookups_total": (
+            "counter", "Cached aggregate lookups by name and outcome", []),
+    }
+
+    for worker, snapshot in sorted(snapshots.items()):
+        for name, counts in sorted(snapshot["caches"].items()):
+            for outcome, count in sorted(counts.items()):
+                families["ticketflow_cache_lookups_total"][2].append(
+                    f"ticketflow_cache_lookups_total"
+                    f"{{{_labels(name=name, outcome=outcome, worker=worker)}}} {count}")
+
+        for view, stats in sorted(snapshot["views"].items()):
+            base = {"view": view, "worker": worker}
+            lines = families["ticketflow_request_duration_seconds"][2]
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), stats["buckets"]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _bound(bound)
+                lines.append(f"ticketflow_request_duration_seconds_bucket"
+                             f"{{{_labels(**base, le=le)}}} {cumulative}")
+            lines.append(f"ticketflow_request_duration_seconds_sum"
+                         f"{{{_labels(**base)}}} {stats['sum']:.6f}")
+            lines.append(f"ticketflow_request_duration_seconds_count"
+                         f"{{{_labels(**base)}}} {stats['count']}")
+
+            for status, count in sorted(stats["statuses"].items()):
+                families["ticketflow_responses_total"][2].append(
+                    f"ticketflow_responses_total{{{_labels(**base, status=status)}}} {count}")
+            for name, key in (("ticketflow_sql_queries_total", "queries"),
+                              ("ticketflow_sql_duration_seconds_total", "sql_seconds"),
+                              ("ticketflow_slow_queries_total", "slow_queries")):
+                value = stats[key]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                families[name][2].append(f"{name}{{{_labels(**base)}}} {value}")
+
+    output = []
+    for name, (kind, help_text, lines) in families.items():
+        output.append(f"# HELP {name} {help_text}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(lines)
+    return "\n".join(output) + "\n"
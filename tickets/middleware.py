@@ -0,0 +1,157 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+from .routers import pinned_to_primary, replica_alias
+
+
+logger = logging.getLogger("tickets.sql")
+
+SLOW_QUERY_MS = getattr(settings, "METRICS_SLOW_QUERY_MS", 200)
+
+PIN_COOKIE = "primary_until"
+
+
+class RequestStats:
+    """SQL issued while serving one request"""
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.slow = 0
+
+    def view_name(self):
+        match = getattr(self.request, "resolver_match", None)
+        return match.view_name if match else "unmatched"
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_seconds += elapsed
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                self.slow += 1
+                logger.warning("Slow query (%.1f ms) in %s: %s",
+                               elapsed * 1000, self.view_name(), sql)
+
+
+class HybridMiddleware:
+    """Base for middleware that runs natively under both WSGI and ASGI.
+
+    Under ASGI a sync-only middleware would make Django run every view,
+    async ones included, in a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request)
+
+    async def __acall__(self, request):
+        return await self.aprocess(request)
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Record latency, status and SQL count/time per URL name.
+
+    Streaming responses are measured until their last chunk is sent,
+    since that is when their queries run.
+    """
+
+    def process(self, request):
+        stats = RequestStats(request)
+        started = time.perf_counter()
+        with self.tracking(stats):
+            response = self.get_response(request)
+        return self.finish(response, stats, started)
+
+    async def aprocess(self, request):
+        stats = RequestStats(request)
+        started = time.perf_counter()
+        with self.tracking(stats):
+            response = await self.get_response(request)
+        return self.finish(response, stats, started)
+
+    def finish(self, response, stats, started):
+        if response.streaming:
+            stream = self.astream if response.is_async else self.stream
+            response.streaming_content = stream(
+                response.streaming_content, stats, started, response.status_code)
+        else:
+            self.record(stats, started, response.status_code)
+        return response
+
+    def tracking(self, stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def stream(self, content, stats, started, status):
+        try:
+            with self.tracking(stats):
+                yield from content
+        finally:
+            self.record(stats, started, status)
+
+    async def astream(self, content, stats, started, status):
+        try:
+            with self.tracking(stats):
+                async for chunk in content:
+                    yield chunk
+        finally:
+            self.record(stats, started, status)
+
+    def record(self, stats, started, status):
+        registry.observe(
+            stats.view_name(), status, time.perf_counter() - started,
+            stats.queries, stats.sql_seconds, stats.slow)
+        registry.maybe_flush()
+
+
+class PrimaryPinMiddleware(HybridMiddleware):
+    """After a client writes, serve its reads from the primary for a while.
+
+    The replica can lag by up to REPLICA_MAX_LAG seconds, so a successful
+    POST sets a cookie that keeps the client off it for that long.
+    """
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def process(self, request):
+        with pinned_to_primary(self.pinned(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def aprocess(self, request):
+        with pinned_to_primary(self.pinned(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    def pin(self, request, response):
+        if (request.method not in ("GET", "HEAD", "OPTIONS")
+                and response.status_code < 400 and replica_alias()):
+            lag = getattr(settings, "REPLICA_MAX_LAG", 60)
+            response.set_cookie(PIN_COOKIE, str(int(time.time() + lag)),
+                                max_age=lag, httponly=True, samesite="Lax")
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:14
+
+from datetime import timedelta
+
+from django.db import migrations, transaction
+
+# Frozen copy of Ticket.SLA_HOURS / SLA_RESPONSE_HOURS at this migration
+SLA_HOURS = {"CRITICAL": 4, "HIGH": 24, "MEDIUM": 72, "LOW": 168}
+SLA_RESPONSE_HOURS = {"CRITICAL": 1, "HIGH": 4, "MEDIUM": 8, "LOW": 24}
+
+CHUNK_SIZE = 2000
+
+
+def backfill_sla(apps, schema_editor):
+    Ticket = apps.get_model("tickets", "Ticket")
+    db = schema_editor.connection.alias
+    fields = ["sla_response_time", "sla_resolution_time",
+              "sla_response_due_at", "sla_due_at"]
+
+    last_id = 0
+    while True:
+        chunk = list(
+            Ticket.objects.using(db)
+            .filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "urgency", "created_at")[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+
+        for t in chunk:
+            t.sla_response_time = SLA_RESPONSE_HOURS.get(t.urgency, 8)
+            t.sla_resolution_time = SLA_HOURS.get(t.urgency, 72)
+            t.sla_response_due_at = t.created_at + \
+                timedelta(hours=t.sla_response_time)
+            t.sla_due_at = t.created_at + timedelta(hours=t.sla_resolution_time)
+
+        with transaction.atomic(using=db):
+            Ticket.objects.using(db).bulk_update(chunk, fields)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    # Each chunk commits on its own so large tables are not locked at once
+    atomic = False
+
+    dependencies = [
+        ('tickets', '0003_ticket_sla_deadlines'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sla, migrations.RunPython.noop),
+    ]
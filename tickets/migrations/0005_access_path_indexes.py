@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_backfill_ticket_sla'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_at'], name='ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'created_at'], name='ticket_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['assigned_to', 'created_at'], name='ticket_assignee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['assigned_to', 'status', 'created_at'], name='ticket_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_by', 'created_at'], name='ticket_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_by', 'status', 'created_at'], name='ticket_creator_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickethistory',
+            index=models.Index(fields=['ticket', 'created_at'], name='history_ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickethistory',
+            index=models.Index(fields=['created_at'], name='history_created_idx'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:40
+
+from django.db import migrations
+
+# FTS5 index over ticket text; rowid is the ticket id. Triggers keep it in
+# sync with tickets_ticket and tickets_comment on every write.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE tickets_ticket_fts USING fts5(
+        title, description, comments,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO tickets_ticket_fts (rowid, title, description, comments)
+    SELECT t.id, t.title, t.description,
+           COALESCE((SELECT group_concat(c.content, ' ')
+                     FROM tickets_comment c WHERE c.ticket_id = t.id), '')
+    FROM tickets_ticket t
+    """,
+    """
+    CREATE TRIGGER tickets_ticket_fts_ai AFTER INSERT ON tickets_ticket
+    BEGIN
+        INSERT INTO tickets_ticket_fts (rowid, title, description, comments)
+        VALUES (new.id, new.title, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_ticket_fts_au
+    AFTER UPDATE OF title, description ON tickets_ticket
+    BEGIN
+        UPDATE tickets_ticket_fts
+        SET title = new.title, description = new.description
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_ticket_fts_ad AFTER DELETE ON tickets_ticket
+    BEGIN
+        DELETE FROM tickets_ticket_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_comment_fts_ai AFTER INSERT ON tickets_comment
+    BEGIN
+        UPDATE tickets_ticket_fts
+        SET comments = comments || ' ' || new.content
+        WHERE rowid = new.ticket_id;
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_comment_fts_au AFTER UPDATE ON tickets_comment
+    BEGIN
+        UPDATE tickets_ticket_fts
+        SET comments = COALESCE((SELECT group_concat(content, ' ')
+                                 FROM tickets_comment
+                                 WHERE ticket_id = tickets_ticket_fts.rowid), '')
+        WHERE rowid IN (old.ticket_id, new.ticket_id);
+    END
+    """,
+    """
+    CREATE TRIGGER tickets_comment_fts_ad AFTER DELETE ON tickets_comment
+    BEGIN
+        UPDATE tickets_ticket_fts
+        SET comments = COALESCE((SELECT group_concat(content, ' ')
+                                 FROM tickets_comment
+                                 WHERE ticket_id = old.ticket_id), '')
+        WHERE rowid = old.ticket_id;
+    END
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS tickets_comment_fts_ad",
+    "DROP TRIGGER IF EXISTS tickets_comment_fts_au",
+    "DROP TRIGGER IF EXISTS tickets_comment_fts_ai",
+    "DROP TRIGGER IF EXISTS tickets_ticket_fts_ad",
+    "DROP TRIGGER IF EXISTS tickets_ticket_fts_au",
+    "DROP TRIGGER IF EXISTS tickets_ticket_fts_ai",
+    "DROP TABLE IF EXISTS tickets_ticket_fts",
+]
+
+
+def run_sqlite(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
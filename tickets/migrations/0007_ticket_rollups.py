@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    Ticket = apps.get_model("tickets", "Ticket")
+    TicketRollup = apps.get_model("tickets", "TicketRollup")
+    db = schema_editor.connection.alias
+
+    groups = (
+        Ticket.objects.using(db)
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "status", "urgency", "category", "assigned_to_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    TicketRollup.objects.using(db).bulk_create(
+        (TicketRollup(day=g["day"], status=g["status"], urgency=g["urgency"],
+                      category=g["category"], assigned_to_id=g["assigned_to_id"],
+                      count=g["n"]) for g in groups.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_ticket_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In Progress'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], max_length=20)),
+                ('urgency', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('CRITICAL', 'Critical')], max_length=20)),
+                ('category', models.CharField(choices=[('HARDWARE', 'Hardware'), ('SOFTWARE', 'Software'), ('NETWORK', 'Network'), ('ACCESS', 'Access & Permissions'), ('EMAIL', 'Email'), ('OTHER', 'Other')], max_length=30)),
+                ('count', models.IntegerField(default=0)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'status', 'urgency', 'category', 'assigned_to'], name='rollup_key_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
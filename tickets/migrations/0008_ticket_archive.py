@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTicket',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=150)),
+                ('description', models.TextField()),
+                ('category', models.CharField(choices=[('HARDWARE', 'Hardware'), ('SOFTWARE', 'Software'), ('NETWORK', 'Network'), ('ACCESS', 'Access & Permissions'), ('EMAIL', 'Email'), ('OTHER', 'Other')], max_length=30)),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In Progress'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], max_length=20)),
+                ('urgency', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('CRITICAL', 'Critical')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('sla_response_time', models.IntegerField(blank=True, null=True)),
+                ('sla_resolution_time', models.IntegerField(blank=True, null=True)),
+                ('sla_response_due_at', models.DateTimeField(blank=True, null=True)),
+                ('sla_due_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField()),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='tickets.archivedticket')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTicketHistory',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('CREATED', 'Created'), ('ASSIGNED', 'Assigned'), ('STATUS_CHANGED', 'Status Changed'), ('COMMENT_ADDED', 'Comment Added'), ('CLOSED', 'Closed')], max_length=30)),
+                ('from_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('to_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('note', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='tickets.archivedticket')),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_ticket_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_id', models.IntegerField()),
+                ('scope', models.CharField(max_length=40)),
+                ('reason', models.CharField(choices=[('DELETED', 'Deleted'), ('ARCHIVED', 'Archived'), ('REASSIGNED', 'Reassigned')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['updated_at'], name='ticket_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['assigned_to', 'updated_at'], name='ticket_assignee_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_by', 'updated_at'], name='ticket_creator_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickettombstone',
+            index=models.Index(fields=['scope', 'id'], name='tombstone_scope_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_ticket_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSearchIndex',
+            fields=[
+                ('ticket', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='tickets.ticket')),
+                ('document', models.TextField(db_column='tickets_ticket_fts')),
+            ],
+            options={
+                'db_table': 'tickets_ticket_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,8 +1,18 @@
-from django.db import models
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from django.db.models.functions import TruncDate
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
+from .cache import scopes_for_ticket
+
 
 class Ticket(models.Model):
     STATUS_CHOICES = (
@@ -28,6 +38,31 @@ class Ticket(models.Model):
         ("OTHER", "Other"),
     )
 
+    OPEN_STATUSES = ("NEW", "IN_PROGRESS")
+
+    is_archived = False
+
+    # Hours an open ticket may stay unresolved, per urgency
+    SLA_HOURS = {
+        "CRITICAL": 4,
+        "HIGH": 24,
+        "MEDIUM": 72,
+        "LOW": 168,
+    }
+    DEFAULT_SLA_HOURS = 72
+
+    # Hours until a first response is due, per urgency
+    SLA_RESPONSE_HOURS = {
+        "CRITICAL": 1,
+        "HIGH": 4,
+        "MEDIUM": 8,
+        "LOW": 24,
+    }
+    DEFAULT_SLA_RESPONSE_HOURS = 8
+
+    SLA_FIELDS = ("sla_response_time", "sla_resolution_time",
+                  "sla_response_due_at", "sla_due_at")
+
     title = models.CharField(max_length=150)
     description = models.TextField()
     category = models.CharField(
@@ -61,10 +96,74 @@ class Ticket(models.Model):
         null=True, blank=True)  # Time until first response
     sla_resolution_time = models.IntegerField(
         null=True, blank=True)  # Time until resolved
+    sla_response_due_at = models.DateTimeField(null=True, blank=True)
+    sla_due_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "sla_due_at"],
+                         name="ticket_status_sla_due_idx"),
+            # Newest-first lists; SQLite appends the rowid (id) to each key
+            models.Index(fields=["created_at"], name="ticket_created_idx"),
+            # Delta sync walks (updated_at, id) forward from a cursor
+            models.Index(fields=["updated_at"], name="ticket_updated_idx"),
+            models.Index(fields=["status", "created_at"],
+                         name="ticket_status_created_idx"),
+            # Role-scoped lists and per-status columns/counters
+            models.Index(fields=["assigned_to", "created_at"],
+                         name="ticket_assignee_created_idx"),
+            models.Index(fields=["assigned_to", "status", "created_at"],
+                         name="ticket_assignee_status_idx"),
+            models.Index(fields=["created_by", "created_at"],
+                         name="ticket_creator_created_idx"),
+            models.Index(fields=["created_by", "status", "created_at"],
+                         name="ticket_creator_status_idx"),
+            models.Index(fields=["assigned_to", "updated_at"],
+                         name="ticket_assignee_updated_idx"),
+            models.Index(fields=["created_by", "updated_at"],
+                         name="ticket_creator_updated_idx"),
+        ]
 
     def __str__(self):
         return f"#{self.id} {self.title} [{self.status}]"
 
+    def save(self, *args, **kwargs):
+        self.apply_sla()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "urgency" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *self.SLA_FIELDS}
+
+        # Keep the analytics rollups in step with this row; inside a caller's
+        # transaction this joins it rather than adding a savepoint
+        with transaction.atomic(savepoint=False):
+            old_key = None
+            if not self._state.adding:
+                old_key = TicketRollup.stored_key(self.pk)
+            super().save(*args, **kwargs)
+            TicketRollup.move(old_key, TicketRollup.key_for(self))
+            if old_key and old_key[4] and old_key[4] != self.assigned_to_id:
+                # Gone from the previous assignee's synced view
+                TicketTombstone.record(
+                    [(self.pk, {f"technician:{old_key[4]}"})], "REASSIGNED")
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            # The post_delete receiver (forget_deleted_ticket) counts the
+            # row as stored, should this instance have unsaved changes
+            self._stored_rollup_key = TicketRollup.stored_key(self.pk)
+            return super().delete(*args, **kwargs)
+
+    def apply_sla(self):
+        """Fill SLA hours and deadlines from urgency and creation time"""
+        start = self.created_at or timezone.now()
+        self.sla_response_time = self.SLA_RESPONSE_HOURS.get(
+            self.urgency, self.DEFAULT_SLA_RESPONSE_HOURS)
+        self.sla_resolution_time = self.SLA_HOURS.get(
+            self.urgency, self.DEFAULT_SLA_HOURS)
+        self.sla_response_due_at = start + \
+            timedelta(hours=self.sla_response_time)
+        self.sla_due_at = start + timedelta(hours=self.sla_resolution_time)
+
     @property
     def time_to_resolve(self):
         """Calculate time to resolve in hours"""
@@ -85,15 +184,15 @@ class Ticket(models.Model):
         if self.status in ["RESOLVED", "CLOSED"]:
             return False
 
-        sla_hours = {
-            "CRITICAL": 4,
-            "HIGH": 24,
-            "MEDIUM": 72,
-            "LOW": 168,
-        }
+        if self.sla_due_at is None:
+            self.apply_sla()
+        return self.sla_due_at < timezone.now()
 
-        max_hours = sla_hours.get(self.urgency, 72)
-        return self.age_in_hours > max_hours
+    @classmethod
+    def overdue_filter(cls, now=None):
+        """Q object matching the same tickets as is_overdue, evaluated in SQL"""
+        now = now or timezone.now()
+        return Q(status__in=cls.OPEN_STATUSES, sla_due_at__lt=now)
 
 
 class Comment(models.Model):
@@ -130,5 +229,334 @@ class TicketHistory(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["ticket", "created_at"],
+                         name="history_ticket_created_idx"),
+            models.Index(fields=["created_at"], name="history_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.action} on Ticket #{self.ticket.id}"
+
+
+class TicketSearchIndex(models.Model):
+    """The FTS5 index from migration 0006, joined to tickets on rowid.
+
+    Read-only: the migration's triggers maintain it. ``document`` is the
+    hidden column FTS5 names after the table, which MATCH and bm25() take.
+    """
+    ticket = models.OneToOneField(
+        Ticket, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column="rowid", db_constraint=False, related_name="search_index")
+    document = models.TextField(db_column="tickets_ticket_fts")
+
+    class Meta:
+        managed = False
+        db_table = "tickets_ticket_fts"
+
+
+class TicketRollup(models.Model):
+    """Ticket counts per creation day, status, urgency, category and assignee.
+
+    Each row holds how many tickets created on that day are currently in
+    that state, so grouping the rollup gives the same numbers as grouping
+    the live Ticket table. Ticket.save()/delete() keep it up to date and
+    ``manage.py rebuild_rollups`` recomputes it from scratch.
+    """
+    KEY_FIELDS = ("day", "status", "urgency", "category", "assigned_to_id")
+
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    urgency = models.CharField(max_length=20, choices=Ticket.URGENCY_CHOICES)
+    category = models.CharField(max_length=30, choices=Ticket.CATEGORY_CHOICES)
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["day", "status", "urgency", "category",
+                                 "assigned_to"], name="rollup_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.urgency}/{self.category}: {self.count}"
+
+    @staticmethod
+    def key_for(ticket):
+        return (
+            timezone.localtime(ticket.created_at).date(),
+            ticket.status,
+            ticket.urgency,
+            ticket.category,
+            ticket.assigned_to_id,
+        )
+
+    @classmethod
+    def stored_key(cls, ticket_id):
+        """Rollup key of the ticket as currently stored, or None"""
+        row = Ticket.objects.filter(id=ticket_id).values_list(
+            "created_at", "status", "urgency", "category", "assigned_to_id",
+        ).first()
+        if row is None:
+            return None
+        return (timezone.localtime(row[0]).date(), *row[1:])
+
+    @classmethod
+    def move(cls, old_key, new_key):
+        """Account for one ticket leaving old_key and entering new_key"""
+        if old_key == new_key:
+            return
+        deltas = Counter()
+        if old_key is not None:
+            deltas[old_key] -= 1
+        if new_key is not None:
+            deltas[new_key] += 1
+        cls.apply_deltas(deltas)
+
+    @classmethod
+    def _covering(cls, keys):
+        """A cheap filter matching at least the rows for keys: one IN per field"""
+        condition = Q()
+        for field, values in zip(cls.KEY_FIELDS, zip(*keys)):
+            values = set(values)
+            match = Q(**{f"{field}__in": values - {None}})
+            if None in values:
+                match |= Q(**{f"{field}__isnull": True})
+            condition &= match
+        return condition
+
+    @classmethod
+    def apply_deltas(cls, deltas, batch_size=200):
+        """Add each delta to the row for its key, creating rows as needed.
+
+        Keys are handled in batches: one read, one UPDATE per distinct delta
+        and one INSERT, so a bulk write costs about as much as a single save.
+        """
+        # Sorted by day, each batch spans few days and its filter stays narrow
+        keys = sorted((key for key, delta in deltas.items() if delta),
+                      key=lambda key: (*key[:4], key[4] or 0))
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            existing = {}
+            for row in cls.objects.filter(cls._covering(batch)):
+                key = tuple(getattr(row, field) for field in cls.KEY_FIELDS)
+                existing.setdefault(key, row)
+
+            by_delta, created = defaultdict(list), []
+            for key in batch:
+                row = existing.get(key)
+                if row is None:
+                    created.append(cls(count=deltas[key],
+                                       **dict(zip(cls.KEY_FIELDS, key))))
+                else:
+                    by_delta[deltas[key]].append(row.id)
+            # Deltas are almost always +1 or -1, so this is one or two UPDATEs
+            for delta, row_ids in by_delta.items():
+                cls.objects.filter(id__in=row_ids).update(count=F("count") + delta)
+            cls.objects.bulk_create(created)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recompute every rollup row from the Ticket table"""
+        groups = (
+            Ticket.objects.annotate(day=TruncDate("created_at"))
+            .values("day", "status", "urgency", "category", "assigned_to_id")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            created = cls.objects.bulk_create(
+                (cls(day=g["day"], status=g["status"], urgency=g["urgency"],
+                     category=g["category"], assigned_to_id=g["assigned_to_id"],
+                     count=g["n"]) for g in groups.iterator()),
+                batch_size=batch_size,
+            )
+        return len(created)
+
+
+class TicketTombstone(models.Model):
+    """A ticket that left a role scope's view, for delta-sync clients.
+
+    Deleting or archiving a ticket removes it from every scope that saw
+    it; reassigning it removes it from the previous technician's scope.
+    Rows only ever get appended, so their id doubles as a sync cursor.
+    """
+    REASON_CHOICES = (
+        ("DELETED", "Deleted"),
+        ("ARCHIVED", "Archived"),
+        ("REASSIGNED", "Reassigned"),
+    )
+
+    ticket_id = models.IntegerField()
+    scope = models.CharField(max_length=40)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["scope", "id"], name="tombstone_scope_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.ticket_id} {self.reason.lower()} for {self.scope}"
+
+    @classmethod
+    def record(cls, removals, reason):
+        """Log (ticket id, scopes) pairs in one INSERT"""
+        cls.objects.bulk_create(
+            cls(ticket_id=ticket_id, scope=scope, reason=reason)
+            for ticket_id, scopes in removals for scope in sorted(scopes))
+
+
+_deletes_handled_by_caller = ContextVar("deletes_handled_by_caller", default=False)
+
+
+@contextmanager
+def deletes_handled_by_caller():
+    """Ticket deletes in this block leave rollups and tombstones to the caller"""
+    token = _deletes_handled_by_caller.set(True)
+    try:
+        yield
+    finally:
+        _deletes_handled_by_caller.reset(token)
+
+
+# Signals rather than Ticket.delete(), so that queryset deletes, the admin's
+# delete action and CASCADE from a deleted user are counted and tombstoned too
+
+@receiver(post_delete, sender=Ticket)
+def forget_deleted_ticket(sender, instance, **kwargs):
+    """Take a deleted ticket out of the rollups and tombstone it"""
+    if _deletes_handled_by_caller.get():
+        return
+    key = getattr(instance, "_stored_rollup_key", None) or TicketRollup.key_for(instance)
+    TicketRollup.move(key, None)
+    TicketTombstone.record(
+        [(instance.pk, scopes_for_ticket(instance, key[4]))], "DELETED")
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def tombstone_unassigned_tickets(sender, instance, **kwargs):
+    """A deleted technician's tickets are unassigned by SET_NULL.
+
+    That UPDATE skips Ticket.save(), so move their rollup counts and record
+    the reassignment here, and bump updated_at so the scopes that keep the
+    tickets sync them again. Tickets the user also created are deleted by
+    CASCADE instead, and forget_deleted_ticket counts those.
+    """
+    assigned = Ticket.objects.filter(assigned_to=instance)
+    unassigned = list(assigned.exclude(created_by=instance).only(
+        "created_at", "status", "urgency", "category", "assigned_to"))
+    deltas = Counter()
+    for ticket in unassigned:
+        key = TicketRollup.key_for(ticket)
+        deltas[key] -= 1
+        deltas[(*key[:4], None)] += 1
+    TicketRollup.apply_deltas(deltas)
+
+    ids = list(assigned.values_list("id", flat=True))
+    if ids:
+        TicketTombstone.record(
+            [(ticket_id, {f"technician:{instance.pk}"}) for ticket_id in ids],
+            "REASSIGNED")
+        assigned.update(updated_at=timezone.now())
+
+
+class ArchivedTicket(models.Model):
+    """A CLOSED ticket moved out of the live tables by ``archive_tickets``.
+
+    Rows keep their original id, so links to the ticket keep working, and
+    the same fields as Ticket, so the detail page and the export can show
+    them unchanged. Nothing on the dashboard, board or analytics reads them.
+    """
+    # Fields copied one-to-one from the live row
+    COPIED_FIELDS = (
+        "id", "title", "description", "category", "status", "urgency",
+        "created_by_id", "assigned_to_id", "created_at", "updated_at",
+        "resolved_at", "closed_at", *Ticket.SLA_FIELDS,
+    )
+
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=150)
+    description = models.TextField()
+    category = models.CharField(max_length=30, choices=Ticket.CATEGORY_CHOICES)
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    urgency = models.CharField(max_length=20, choices=Ticket.URGENCY_CHOICES)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    sla_response_time = models.IntegerField(null=True, blank=True)
+    sla_resolution_time = models.IntegerField(null=True, blank=True)
+    sla_response_due_at = models.DateTimeField(null=True, blank=True)
+    sla_due_at = models.DateTimeField(null=True, blank=True)
+
+    archived_at = models.DateTimeField()
+
+    is_archived = True
+    is_overdue = False
+    time_to_resolve = Ticket.time_to_resolve
+    age_in_hours = Ticket.age_in_hours
+
+    def __str__(self):
+        return f"#{self.id} {self.title} [archived]"
+
+
+class ArchivedComment(models.Model):
+    COPIED_FIELDS = ("id", "ticket_id", "author_id", "content", "created_at")
+
+    id = models.IntegerField(primary_key=True)
+    ticket = models.ForeignKey(
+        ArchivedTicket, on_delete=models.CASCADE, related_name="comments")
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+
+    content = models.TextField()
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Comment by {self.author} on archived Ticket #{self.ticket_id}"
+
+
+class ArchivedTicketHistory(models.Model):
+    COPIED_FIELDS = ("id", "ticket_id", "actor_id", "action", "from_status",
+                     "to_status", "note", "created_at")
+
+    id = models.IntegerField(primary_key=True)
+    ticket = models.ForeignKey(
+        ArchivedTicket, on_delete=models.CASCADE, related_name="history")
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+
+    action = models.CharField(max_length=30, choices=TicketHistory.ACTION_CHOICES)
+    from_status = models.CharField(max_length=20, blank=True, null=True)
+    to_status = models.CharField(max_length=20, blank=True, null=True)
+    note = models.CharField(max_length=255, blank=True, null=True)
+
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.action} on archived Ticket #{self.ticket_id}"
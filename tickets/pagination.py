@@ -0,0 +1,160 @@
+"""Keyset (cursor) pagination for ticket lists.
+
+Pages are addressed by the sort key of their boundary row rather than by
+OFFSET, so fetching page N costs the same as fetching page 1. Lists are
+ordered newest first on (created_at, id) unless another descending key is
+given, e.g. (search_score, id) for ranked search results.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+
+DEFAULT_KEY = ("created_at", "id")
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(direction, row, key=DEFAULT_KEY):
+    values = [_encode_value(getattr(row, field)) for field in key]
+    raw = json.dumps([direction, values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def key_fields(queryset, key=DEFAULT_KEY):
+    """The model field or annotation output field behind each key column"""
+    fields = []
+    for name in key:
+        try:
+            fields.append(queryset.model._meta.get_field(name))
+        except FieldDoesNotExist:
+            fields.append(queryset.query.annotations[name].output_field)
+    return fields
+
+
+def _decode_value(field, value):
+    value = field.to_python(value)
+    if value is None:
+        raise ValueError("Cursor values cannot be null")
+    if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+        raise ValueError("Cursor datetimes must carry a UTC offset")
+    return value
+
+
+def decode_cursor(cursor, key=DEFAULT_KEY, fields=None):
+    """Return (direction, values), or None for a malformed cursor.
+
+    With fields (see key_fields), each value is also converted with its
+    field's to_python(), so a tampered or stale cursor is rejected here
+    rather than failing inside the page query.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        return None
+    if len(values) != len(key):
+        return None
+    if fields is not None:
+        try:
+            values = [_decode_value(f, v) for f, v in zip(fields, values)]
+        except (ValidationError, ValueError, TypeError):
+            return None
+    return direction, values
+
+
+def get_page_size(value):
+    """Clamp a requested page size to the configured bounds"""
+    default = getattr(settings, "TICKETS_PAGE_SIZE", 50)
+    maximum = getattr(settings, "TICKETS_MAX_PAGE_SIZE", 200)
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def _beyond(key, values, lookup):
+    """Rows strictly past values in key order, e.g. (a < x) or (a = x and b < y)"""
+    conditions = []
+    for i, field in enumerate(key):
+        equal = dict(zip(key[:i], values[:i]))
+        conditions.append(Q(**equal, **{f"{field}__{lookup}": values[i]}))
+    return reduce(or_, conditions)
+
+
+def paginate_tickets(queryset, cursor=None, page_size=None, key=DEFAULT_KEY):
+    """Return one KeysetPage of queryset, ordered by key descending.
+
+    A malformed cursor falls back to the first page.
+    """
+    page_size = page_size or get_page_size(None)
+    descending = [f"-{field}" for field in key]
+    decoded = decode_cursor(cursor, key, key_fields(queryset, key)) if cursor else None
+
+    if decoded is None:
+        rows = list(queryset.order_by(*descending)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor("next", rows[-1], key) if has_more else None,
+        )
+
+    direction, values = decoded
+
+    if direction == "next":
+        rows = list(queryset.filter(_beyond(key, values, "lt")).order_by(
+            *descending)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor("next", rows[-1], key) if has_more else None,
+            previous_cursor=encode_cursor("prev", rows[0], key) if rows else None,
+        )
+
+    # Walking backwards: read ascending from the cursor, then flip
+    rows = list(queryset.filter(_beyond(key, values, "gt")).order_by(
+        *key)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size][::-1]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor("next", rows[-1], key) if rows else None,
+        previous_cursor=encode_cursor("prev", rows[0], key) if has_more else None,
+    )
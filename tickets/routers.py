@@ -0,0 +1,75 @@
+"""Send heavy read-only work to a replica database, if one is configured.
+
+Nothing reads from the replica by default. Code opts in for a block with
+``replica_reads()`` (analytics, the dashboard summary) or asks for the
+alias with ``replica_db()`` (the streamed export, whose queries run after
+the view has returned). Writes always go to the primary.
+
+A client that has just written is pinned to the primary for
+REPLICA_MAX_LAG seconds (PrimaryPinMiddleware), so it never reads back
+older data than it wrote.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+PRIMARY = "default"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_pinned = ContextVar("pinned_to_primary", default=False)
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica"""
+    alias = getattr(settings, "TICKETS_REPLICA_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+def replica_db():
+    """Alias for replica-tolerant reads made right now"""
+    alias = replica_alias()
+    if alias is None or _pinned.get():
+        return PRIMARY
+    return alias
+
+
+def reading_replica():
+    return _replica_reads.get() and replica_db() != PRIMARY
+
+
+@contextmanager
+def replica_reads():
+    """Route reads inside this block to the replica when allowed"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def pinned_to_primary(pinned=True):
+    token = _pinned.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return replica_db() if reading_replica() else None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, never migrated on its own
+        return db != replica_alias()
@@ -0,0 +1,68 @@
+"""Full-text ticket search backed by the SQLite FTS5 index.
+
+Migration 0006 creates ``tickets_ticket_fts`` (rowid = ticket id) over the
+ticket title, description and the concatenated content of its comments,
+and keeps it in sync with triggers. Queries reach it through the
+unmanaged TicketSearchIndex model, so the index is joined once on rowid
+rather than probed per ticket. On other databases search falls back to a
+plain substring match.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+
+from .models import TicketSearchIndex
+
+
+FTS_TABLE = TicketSearchIndex._meta.db_table
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class Match(Lookup):
+    """document__match=query, an FTS5 MATCH on the whole row"""
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
+
+
+TicketSearchIndex._meta.get_field("document").register_lookup(Match)
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word, as a prefix, ANDed"""
+    return " ".join(f'"{token}"*' for token in TOKEN_RE.findall(text))
+
+
+def search_tickets(tickets, text):
+    """Filter tickets to those matching text.
+
+    Returns (queryset, pagination key). Full-text matches carry a
+    ``search_score`` annotation (higher is better) and are paged on it.
+    """
+    match = build_match_query(text)
+    if not match:
+        return tickets.none(), ("created_at", "id")
+
+    if not fts_available():
+        return tickets.filter(
+            Q(title__icontains=text) | Q(description__icontains=text)
+        ), ("created_at", "id")
+
+    # One MATCH drives the join; bm25() is more negative for better
+    # matches, so flip it so higher wins
+    score = -Func(F("search_index__document"), Value(10.0), Value(2.0), Value(1.0),
+                  function="bm25", output_field=FloatField())
+
+    tickets = tickets.filter(search_index__document__match=match).annotate(
+        search_score=score)
+    return tickets, ("search_score", "id")
@@ -0,0 +1,120 @@
+"""Delta sync: what changed in a role scope since the client's cursor.
+
+Clients keep a local copy of the tickets they can see. Each call returns
+the tickets created or updated after the cursor, walked in (updated_at,
+id) order on the updated_at indexes, plus the ids of tickets that left
+the scope (TicketTombstone rows after the cursor), and a new cursor.
+
+Clients apply ``deleted`` before ``changed``: a ticket reassigned away
+and back within one window appears in both and must end up present. Both
+streams stop at one high-water mark per page, so a tombstone never
+arrives on a later page than a change that supersedes it. Calling
+without a cursor pages through the whole scope first.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TicketTombstone
+
+
+FIELDS = (
+    "id", "title", "status", "urgency", "category", "created_by_id",
+    "assigned_to_id", "created_at", "updated_at", "resolved_at", "closed_at",
+    "sla_due_at",
+)
+
+UPDATED_AT = FIELDS.index("updated_at")
+
+PAGE_SIZE = getattr(settings, "TICKETS_SYNC_PAGE_SIZE", 500)
+
+
+def encode_cursor(updated_at, ticket_id, tombstone_id):
+    raw = json.dumps([updated_at.isoformat() if updated_at else None,
+                      ticket_id, tombstone_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (updated_at, ticket id, tombstone id), or None if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, ticket_id, tombstone_id = json.loads(base64.urlsafe_b64decode(padded))
+        if updated_at is not None:
+            updated_at = datetime.fromisoformat(updated_at)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if updated_at is not None and timezone.is_naive(updated_at):
+        return None
+    # bool is an int subclass, but true/false are no ids
+    for value in (ticket_id, tombstone_id):
+        if not isinstance(value, int) or isinstance(value, bool):
+            return None
+    return updated_at, ticket_id, tombstone_id
+
+
+def changed_since(tickets, updated_at, ticket_id):
+    """The tickets after an (updated_at, id) cursor, in that order"""
+    if updated_at is not None:
+        # The OR alone can't seek the index; the redundant lower bound lets
+        # SQLite start the range at the cursor instead of the scope's start
+        tickets = tickets.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=ticket_id),
+            updated_at__gte=updated_at)
+    return tickets.order_by("updated_at", "id")
+
+
+def changes(tickets, scope, cursor=None, page_size=PAGE_SIZE):
+    """One page of changes to tickets (a role-scoped queryset) after cursor.
+
+    Returns None for a malformed cursor.
+    """
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return None
+        updated_at, ticket_id, tombstone_id = decoded
+    else:
+        # A full copy is being made, so only later removals matter
+        updated_at, ticket_id = None, 0
+        tombstone_id = TicketTombstone.objects.order_by("-id").values_list(
+            "id", flat=True).first() or 0
+
+    fetched_changed = list(changed_since(tickets, updated_at, ticket_id).values_list(
+        *FIELDS)[:page_size + 1])
+    fetched_removed = list(TicketTombstone.objects.filter(
+        scope=scope, id__gt=tombstone_id).order_by("id").values_list(
+        "id", "ticket_id", "created_at")[:page_size + 1])
+
+    # Cut both streams at one high-water mark: a tombstone older than a
+    # change sent on this page must be sent on this page too
+    changed, removed = fetched_changed, fetched_removed
+    if len(changed) > page_size:
+        changed = changed[:page_size]
+        high_water = changed[-1][UPDATED_AT]
+        removed = [row for row in removed if row[2] < high_water]
+    if len(removed) > page_size:
+        removed = removed[:page_size]
+        high_water = removed[-1][2]
+        changed = [row for row in changed if row[UPDATED_AT] <= high_water]
+    has_more = (len(changed) < len(fetched_changed)
+                or len(removed) < len(fetched_removed))
+
+    if changed:
+        updated_at, ticket_id = changed[-1][UPDATED_AT], changed[-1][0]
+    if removed:
+        tombstone_id = removed[-1][0]
+
+    return {
+        "fields": FIELDS,
+        "changed": changed,
+        "deleted": [removed_id for _, removed_id, _ in removed],
+        "cursor": encode_cursor(updated_at, ticket_id, tombstone_id),
+        "has_more": has_more,
+    }
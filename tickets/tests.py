@@ -1,3 +1,1827 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import ExitStack, closing
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.test import (
+    AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import User
+from . import (
+    benchmark, cache as tickets_cache, events, loadtest, metrics, routers, sync, views,
+)
+from .archive import archive_closed
+from .bulk import write_tickets
+from .db import is_lock_error, retry_on_lock
+from .middleware import PIN_COOKIE
+from .models import (
+    ArchivedComment, ArchivedTicket, ArchivedTicketHistory, Comment, Ticket,
+    TicketHistory, TicketRollup, TicketTombstone,
+)
+from .search import search_tickets
+from .stats import duration_breakdowns, duration_stats, technician_stats
+
+
+class TicketTestCase(TestCase):
+    """Shared fixtures: one admin, two technicians and two users"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin", password="pass", role="admin")
+        cls.tech = User.objects.create_user(
+            "tech", password="pass", role="technician")
+        cls.tech2 = User.objects.create_user(
+            "tech2", password="pass", role="technician")
+        cls.user = User.objects.create_user(
+            "user", password="pass", role="user")
+        cls.user2 = User.objects.create_user(
+            "user2", password="pass", role="user")
+
+    def tearDown(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def make_ticket(self, age_hours=0, **kwargs):
+        kwargs.setdefault("title", "Printer jam")
+        kwargs.setdefault("description", "Paper stuck in tray 2")
+        kwargs.setdefault("created_by", self.user)
+        t = Ticket.objects.create(**kwargs)
+        if age_hours:
+            t.created_at = timezone.now() - timedelta(hours=age_hours)
+            t.save()
+        return t
+
+    def live_groups(self):
+        rows = Ticket.objects.annotate(day=TruncDate("created_at")).values(
+            "day", "status", "urgency", "category", "assigned_to"
+        ).annotate(n=Count("id"))
+        return {tuple(r[f] for f in ("day", "status", "urgency", "category",
+                                     "assigned_to")): r["n"] for r in rows}
+
+    def rollup_groups(self):
+        rows = TicketRollup.objects.values(
+            "day", "status", "urgency", "category", "assigned_to"
+        ).annotate(n=Sum("count")).filter(n__gt=0)
+        return {tuple(r[f] for f in ("day", "status", "urgency", "category",
+                                     "assigned_to")): r["n"] for r in rows}
+
+    def resolve(self, hours, close_after=None, **kwargs):
+        t = self.make_ticket(age_hours=200, **kwargs)
+        t.status = "RESOLVED"
+        t.resolved_at = t.created_at + timedelta(hours=hours)
+        if close_after is not None:
+            t.status = "CLOSED"
+            t.closed_at = t.resolved_at + timedelta(hours=close_after)
+        t.save()
+        return t
+
+
+class DashboardSummaryTests(TicketTestCase):
+
+    def setUp(self):
+        self.make_ticket(urgency="CRITICAL", age_hours=5, assigned_to=self.tech)
+        self.make_ticket(urgency="CRITICAL", age_hours=1, assigned_to=self.tech)
+        self.make_ticket(urgency="HIGH", age_hours=30, status="IN_PROGRESS")
+        self.make_ticket(urgency="LOW", age_hours=100, created_by=self.user2)
+        self.make_ticket(urgency="LOW", age_hours=200, status="RESOLVED")
+
+    def summary_for(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse("dashboard")).context["summary"]
+
+    def test_overdue_filter_matches_is_overdue(self):
+        expected = {t.id for t in Ticket.objects.all() if t.is_overdue}
+        actual = set(Ticket.objects.filter(
+            Ticket.overdue_filter()).values_list("id", flat=True))
+        self.assertEqual(actual, expected)
+        self.assertEqual(len(actual), 2)
+
+    def test_sla_deadlines_follow_urgency(self):
+        t = self.make_ticket(urgency="HIGH")
+        self.assertEqual(t.sla_resolution_time, 24)
+        self.assertAlmostEqual(t.sla_due_at - t.created_at,
+                               timedelta(hours=24), delta=timedelta(seconds=1))
+        self.assertAlmostEqual(t.sla_response_due_at - t.created_at,
+                               timedelta(hours=4), delta=timedelta(seconds=1))
+
+        t.urgency = "CRITICAL"
+        t.save(update_fields=["urgency"])
+        t.refresh_from_db()
+        self.assertEqual(t.sla_due_at - t.created_at, timedelta(hours=4))
+
+    def test_admin_summary(self):
+        self.assertEqual(self.summary_for(self.admin), {
+            "total": 5, "new": 3, "in_progress": 1, "resolved": 1, "closed": 0,
+            "critical": 2, "overdue": 2,
+        })
+
+    def test_summary_is_role_scoped(self):
+        self.assertEqual(self.summary_for(self.tech)["total"], 2)
+        self.assertEqual(self.summary_for(self.tech)["overdue"], 1)
+        self.assertEqual(self.summary_for(self.user2)["total"], 1)
+        self.assertEqual(self.summary_for(self.user2)["overdue"], 0)
+
+
+@override_settings(TICKETS_PAGE_SIZE=3)
+class DashboardPaginationTests(TicketTestCase):
+
+    def setUp(self):
+        # Several tickets share a created_at to exercise the id tie-breaker
+        same_time = timezone.now() - timedelta(hours=2)
+        for i in range(8):
+            t = self.make_ticket(title=f"Ticket {i}",
+                                 urgency="HIGH" if i % 2 else "LOW")
+            if i < 4:
+                Ticket.objects.filter(id=t.id).update(created_at=same_time)
+        self.client.force_login(self.admin)
+
+    def walk(self, params, key="next_cursor"):
+        seen = []
+        while True:
+            page = self.client.get(reverse("dashboard"), params).context["page"]
+            seen.extend(t.id for t in page)
+            cursor = getattr(page, key)
+            if cursor is None:
+                return seen, page
+            params = {**params, "cursor": cursor}
+
+    def test_pages_cover_every_ticket_once_in_order(self):
+        seen, _ = self.walk({})
+        expected = list(Ticket.objects.order_by(
+            "-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_to_earlier_page(self):
+        first = self.client.get(reverse("dashboard")).context["page"]
+        second = self.client.get(
+            reverse("dashboard"), {"cursor": first.next_cursor}).context["page"]
+        back = self.client.get(
+            reverse("dashboard"), {"cursor": second.previous_cursor}).context["page"]
+        self.assertEqual([t.id for t in back], [t.id for t in first])
+        self.assertFalse(back.has_previous)
+
+    def test_filters_apply_across_pages(self):
+        seen, _ = self.walk({"urgency": "HIGH"})
+        self.assertEqual(len(seen), 4)
+        self.assertTrue(all(
+            u == "HIGH" for u in Ticket.objects.filter(
+                id__in=seen).values_list("urgency", flat=True)))
+
+    def test_page_size_parameter_and_bad_cursor(self):
+        response = self.client.get(
+            reverse("dashboard"), {"page_size": 5, "cursor": "garbage"})
+        self.assertEqual(len(response.context["page"]), 5)
+
+    def test_tampered_cursor_values_fall_back_to_first_page(self):
+        first = [t.id for t in self.client.get(
+            reverse("dashboard"), {"page_size": 3}).context["page"]]
+        tampered = [
+            ["next", ["not a date", 1]],
+            ["next", ["2024-13-45T00:00:00+00:00", 1]],
+            ["next", ["2024-01-01T00:00:00", 1]],
+            ["next", ["2024-01-01T00:00:00+00:00", "one"]],
+            ["next", ["2024-01-01T00:00:00+00:00", None]],
+            ["prev", [{"a": 1}, [2]]],
+        ]
+        for raw in tampered:
+            cursor = base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+            with self.subTest(raw=raw):
+                response = self.client.get(
+                    reverse("dashboard"), {"page_size": 3, "cursor": cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([t.id for t in response.context["page"]], first)
+
+
+class ExportTests(TicketTestCase):
+
+    def test_streams_rows_with_joined_usernames(self):
+        resolved = self.make_ticket(assigned_to=self.tech, age_hours=10)
+        resolved.status = "RESOLVED"
+        resolved.resolved_at = resolved.created_at + timedelta(hours=3)
+        resolved.save()
+        self.make_ticket(urgency="CRITICAL", age_hours=6)
+        for _ in range(5):
+            self.make_ticket()
+
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(4):  # session, user, live and archived rows
+            response = self.client.get(reverse("export_tickets"))
+            body = b"".join(response.streaming_content).decode()
+
+        lines = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(len(lines), 8)
+        self.assertEqual(lines[1][5:7], ["user", "tech"])
+        self.assertEqual(lines[1][9], "3.0")
+        self.assertEqual(lines[2][6], "Unassigned")
+        self.assertEqual(lines[2][10], "Yes")
+        self.assertEqual(lines[3][10], "No")
+
+
+class ResolutionStatsTests(TicketTestCase):
+
+    def test_durations_are_aggregated_per_group(self):
+        self.resolve(2, category="NETWORK", assigned_to=self.tech)
+        self.resolve(4, close_after=1, category="NETWORK", assigned_to=self.tech)
+        self.resolve(9, category="EMAIL", urgency="HIGH", assigned_to=self.tech2)
+        self.make_ticket(category="EMAIL")
+
+        overall = duration_stats(Ticket.objects.all())
+        self.assertEqual(overall["resolved_count"], 3)
+        self.assertEqual(overall["resolve_avg"], 5.0)
+        self.assertEqual(overall["resolve_min"], 2.0)
+        self.assertEqual(overall["resolve_max"], 9.0)
+        self.assertEqual(overall["resolve_sum"], 15.0)
+        self.assertEqual(overall["closed_count"], 1)
+        self.assertEqual(overall["close_avg"], 5.0)
+
+        by_category = {r["label"]: r for r in duration_stats(
+            Ticket.objects.all(), "category")}
+        self.assertEqual(by_category["NETWORK"]["resolve_avg"], 3.0)
+        self.assertEqual(by_category["EMAIL"]["resolve_sum"], 9.0)
+
+        by_tech = {r["label"]: r for r in duration_stats(
+            Ticket.objects.all(), "assigned_to__username")}
+        self.assertEqual(by_tech["tech"]["resolve_max"], 4.0)
+        self.assertEqual(by_tech["tech2"]["resolved_count"], 1)
+
+    def test_breakdowns_share_one_query(self):
+        self.resolve(2, category="NETWORK", assigned_to=self.tech)
+        self.resolve(4, close_after=1, category="NETWORK", urgency="HIGH")
+        self.resolve(9, category="EMAIL", urgency="HIGH", assigned_to=self.tech2)
+        fields = ("category", "urgency", "assigned_to__username")
+
+        with self.assertNumQueries(1):
+            overall, breakdowns = duration_breakdowns(Ticket.objects.all(), fields)
+
+        self.assertEqual(overall, duration_stats(Ticket.objects.all()))
+        for field in fields:
+            self.assertEqual(breakdowns[field], duration_stats(
+                Ticket.objects.exclude(**{f"{field}__isnull": True}), field))
+        self.assertEqual([r["label"] for r in breakdowns["assigned_to__username"]],
+                         ["tech", "tech2"])
+
+    def test_analytics_average_matches(self):
+        self.resolve(3)
+        self.resolve(6)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("analytics"))
+        self.assertEqual(response.context["avg_resolution_time"], 4.5)
+
+
+class TechnicianStatsTests(TicketTestCase):
+
+    def test_counters_and_median_in_fixed_queries(self):
+        for hours in (1, 2, 6, 10):
+            self.resolve(hours, assigned_to=self.tech)
+        for hours in (3, 5, 7):
+            self.resolve(hours, assigned_to=self.tech2)
+        self.make_ticket(assigned_to=self.tech, status="IN_PROGRESS")
+        self.make_ticket(assigned_to=self.tech, urgency="CRITICAL",
+                         age_hours=8)
+        User.objects.create_user("idle", password="pass", role="technician")
+
+        with self.assertNumQueries(2):
+            stats = {s["technician"].username: s for s in technician_stats()}
+
+        self.assertEqual(stats["tech"]["total"], 6)
+        self.assertEqual(stats["tech"]["resolved"], 4)
+        self.assertEqual(stats["tech"]["in_progress"], 1)
+        self.assertEqual(stats["tech"]["overdue"], 1)
+        self.assertEqual(stats["tech"]["median_resolution"], 4.0)
+        self.assertEqual(stats["tech2"]["median_resolution"], 5.0)
+        self.assertEqual(stats["idle"]["total"], 0)
+        self.assertIsNone(stats["idle"]["median_resolution"])
+
+
+class QueryPlanTests(TicketTestCase):
+    """Guard the composite indexes against silent full-table scans"""
+
+    def setUp(self):
+        for i in range(20):
+            self.make_ticket(assigned_to=self.tech if i % 2 else None,
+                             status="IN_PROGRESS" if i % 3 else "NEW")
+
+    def plans(self, user, url, params=None, table="tickets_ticket"):
+        """EXPLAIN QUERY PLAN for each query on table issued by one request"""
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, params or {})
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if f'FROM "{table}"' not in query["sql"]:
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plans.append((query["sql"], [row[-1] for row in cursor]))
+        self.assertTrue(plans)
+        return plans
+
+    def list_plan(self, user, params=None):
+        for sql, plan in self.plans(user, reverse("dashboard"), params):
+            if "LIMIT" in sql and "ORDER BY" in sql:
+                return " | ".join(plan)
+        self.fail("dashboard list query not found")
+
+    def assertNoFullScan(self, plans):
+        for sql, plan in plans:
+            for step in plan:
+                self.assertFalse(step.startswith("SCAN tickets_"),
+                                 f"{step!r} in plan for {sql}")
+
+    def test_dashboard_list_is_read_in_index_order(self):
+        cases = [
+            (self.admin, {}, "ticket_created_idx"),
+            (self.admin, {"status": "NEW"}, "ticket_status_created_idx"),
+            (self.tech, {}, "ticket_assignee_created_idx"),
+            (self.tech, {"status": "NEW"}, "ticket_assignee_status_idx"),
+            (self.user, {}, "ticket_creator_created_idx"),
+            (self.user, {"status": "NEW"}, "ticket_creator_status_idx"),
+        ]
+        for user, params, index in cases:
+            with self.subTest(role=user.role, params=params):
+                plan = self.list_plan(user, params)
+                self.assertIn(index, plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_scoped_views_never_scan_tickets(self):
+        for user in (self.tech, self.user):
+            for name in ("dashboard", "board", "analytics"):
+                with self.subTest(role=user.role, view=name):
+                    self.assertNoFullScan(self.plans(user, reverse(name)))
+
+    def test_board_columns_use_status_indexes(self):
+        for user, index in ((self.admin, "ticket_status_created_idx"),
+                            (self.tech, "ticket_assignee_status_idx")):
+            for sql, plan in self.plans(user, reverse("board")):
+                # Counts and column pages; the validators are checked below
+                if "GROUP BY" in sql or "LIMIT" in sql:
+                    self.assertIn(index, " | ".join(plan))
+
+    def test_history_reads_use_ticket_time_index(self):
+        t = Ticket.objects.first()
+        with connection.cursor() as cursor:
+            sql, params = t.history.order_by(
+                "created_at").query.sql_with_params()
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " | ".join(row[-1] for row in cursor)
+        self.assertIn("history_ticket_created_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        recent = self.plans(self.admin, reverse("analytics"),
+                            table="tickets_tickethistory")
+        self.assertIn("history_created_idx", " | ".join(recent[0][1]))
+
+    def test_sync_walks_updated_at_indexes(self):
+        for user, index in ((self.admin, "ticket_updated_idx"),
+                            (self.tech, "ticket_assignee_updated_idx"),
+                            (self.user, "ticket_creator_updated_idx")):
+            with self.subTest(role=user.role):
+                self.client.force_login(user)
+                cursor = self.client.get(reverse("api_ticket_changes")).json()["cursor"]
+                plan = " | ".join(self.plans(user, reverse("api_ticket_changes"),
+                                             {"cursor": cursor})[0][1])
+                self.assertIn(index, plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_sync_seeks_to_the_cursor(self):
+        # Planned with bound parameters, as executed: with literal values
+        # SQLite can derive the range that bound ones need spelled out
+        updated_at = Ticket.objects.order_by("updated_at").values_list(
+            "updated_at", flat=True)[5]
+        for tickets, index in ((Ticket.objects.all(), "ticket_updated_idx"),
+                               (Ticket.objects.filter(assigned_to=self.tech),
+                                "ticket_assignee_updated_idx")):
+            query = sync.changed_since(tickets, updated_at, 5).values_list(
+                *sync.FIELDS)[:10]
+            sql, params = query.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plan = " | ".join(row[-1] for row in cursor)
+            self.assertIn(f"SEARCH tickets_ticket USING INDEX {index}", plan)
+            self.assertIn("updated_at>?", plan)
+
+
+class SearchTests(TicketTestCase):
+
+    def setUp(self):
+        self.vpn = self.make_ticket(
+            title="VPN drops every hour", description="Remote access fails")
+        self.printer = self.make_ticket(
+            title="Printer offline", description="Finance printer",
+            created_by=self.user2)
+        self.mail = self.make_ticket(
+            title="Mailbox full", description="Cannot receive mail")
+        Comment.objects.create(ticket=self.mail, author=self.tech,
+                               content="Archived old messages from the VPN")
+
+    def search(self, user, text, **params):
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse("dashboard"), {"search": text, **params})
+        return [t.id for t in response.context["page"]]
+
+    def test_matches_description_and_comments_by_prefix(self):
+        self.assertEqual(self.search(self.admin, "financ"), [self.printer.id])
+        self.assertEqual(self.search(self.admin, "archiv"), [self.mail.id])
+
+    def test_title_hits_rank_above_comment_hits(self):
+        self.assertEqual(self.search(self.admin, "vpn"),
+                         [self.vpn.id, self.mail.id])
+
+    def test_tampered_score_cursor_falls_back_to_first_page(self):
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(["next", ["high", self.vpn.id]]).encode()).decode()
+        self.assertEqual(self.search(self.admin, "vpn", cursor=cursor),
+                         [self.vpn.id, self.mail.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.printer.title = "Scanner offline"
+        self.printer.save()
+        self.assertEqual(self.search(self.admin, "scanner"), [self.printer.id])
+
+        self.mail.comments.all().delete()
+        self.assertEqual(self.search(self.admin, "archived"), [])
+
+        self.vpn.delete()
+        self.assertEqual(self.search(self.admin, "vpn"), [])
+
+    def test_role_scope_still_applies(self):
+        self.assertEqual(self.search(self.user, "printer"), [])
+        self.assertEqual(self.search(self.user2, "printer"), [self.printer.id])
+
+    def test_ranked_results_paginate(self):
+        for i in range(5):
+            self.make_ticket(title=f"VPN token {i}")
+        self.client.force_login(self.admin)
+        seen, params = [], {"search": "vpn", "page_size": 2}
+        while True:
+            page = self.client.get(reverse("dashboard"), params).context["page"]
+            seen.extend(t.id for t in page)
+            if not page.has_next:
+                break
+            params["cursor"] = page.next_cursor
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_punctuation_only_search_returns_nothing(self):
+        self.assertEqual(self.search(self.admin, '"*'), [])
+
+    def test_index_is_matched_once_per_query(self):
+        tickets, key = search_tickets(Ticket.objects.all(), "vpn")
+        page = tickets.filter(search_score__lt=1e9).order_by(*(f"-{f}" for f in key))
+        sql, params = page.query.sql_with_params()
+        self.assertEqual(sql.count("MATCH"), 1)
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " | ".join(row[-1] for row in cursor)
+        self.assertIn("tickets_ticket_fts VIRTUAL TABLE", plan)
+        self.assertNotIn("SUBQUERY", plan)
+        self.assertEqual([t.id for t in page], [self.vpn.id, self.mail.id])
+
+
+class TicketDetailQueryTests(TicketTestCase):
+
+    def add_activity(self, ticket, n):
+        for i in range(n):
+            author = self.user if i % 2 else self.tech
+            Comment.objects.create(ticket=ticket, author=author,
+                                   content=f"Update {i}")
+            TicketHistory.objects.create(ticket=ticket, actor=author,
+                                         action="COMMENT_ADDED")
+
+    def test_query_count_does_not_grow_with_activity(self):
+        quiet = self.make_ticket(assigned_to=self.tech)
+        busy = self.make_ticket(assigned_to=self.tech)
+        self.add_activity(quiet, 1)
+        self.add_activity(busy, 60)
+
+        # session, user, validator, ticket, comments, history
+        # (+ the technician list, in the validator and the page, for admin)
+        for user, expected in ((self.admin, 8), (self.tech, 6), (self.user, 6)):
+            self.client.force_login(user)
+            for ticket in (quiet, busy):
+                with self.subTest(role=user.role, ticket=ticket.id):
+                    with self.assertNumQueries(expected):
+                        response = self.client.get(
+                            reverse("ticket_detail", args=[ticket.id]))
+                    self.assertEqual(response.status_code, 200)
+
+    def test_activity_is_listed_in_order(self):
+        t = self.make_ticket()
+        self.add_activity(t, 3)
+        self.client.force_login(self.user)
+        body = self.client.get(reverse("ticket_detail", args=[t.id])).content
+        self.assertLess(body.index(b"Update 0"), body.index(b"Update 2"))
+
+    def test_access_rules_unchanged(self):
+        t = self.make_ticket(assigned_to=self.tech)
+        for user, status in ((self.user2, 403), (self.tech2, 403),
+                             (self.user, 200), (self.tech, 200)):
+            self.client.force_login(user)
+            response = self.client.get(reverse("ticket_detail", args=[t.id]))
+            self.assertEqual(response.status_code, status)
+
+
+@override_settings(BOARD_COLUMN_SIZE=3)
+class BoardTests(TicketTestCase):
+
+    def setUp(self):
+        for i in range(7):
+            self.make_ticket(status="CLOSED", title=f"Closed {i}")
+        self.open_ticket = self.make_ticket(assigned_to=self.tech)
+        self.client.force_login(self.admin)
+
+    def columns(self):
+        response = self.client.get(reverse("board"))
+        return {c["status"]: c for c in response.context["columns"]}
+
+    def test_columns_are_bounded_but_counted_in_full(self):
+        # session, user, 3 validator queries, counts, 2 non-empty columns
+        with self.assertNumQueries(8):
+            columns = self.columns()
+        self.assertEqual(columns["CLOSED"]["count"], 7)
+        self.assertEqual(len(columns["CLOSED"]["cards"]), 3)
+        self.assertEqual(columns["NEW"]["count"], 1)
+        self.assertIsNone(columns["NEW"]["next_cursor"])
+        self.assertEqual(columns["IN_PROGRESS"]["cards"], [])
+
+    def test_column_endpoint_pages_through_the_rest(self):
+        cursor = self.columns()["CLOSED"]["next_cursor"]
+        loaded = 3
+        while cursor:
+            data = self.client.get(reverse("api_board_column", args=["CLOSED"]),
+                                   {"cursor": cursor}).json()
+            loaded += data["html"].count("data-ticket=")
+            cursor = data["next_cursor"]
+        self.assertEqual(loaded, 7)
+
+    def test_column_endpoint_is_scoped_and_validated(self):
+        self.client.force_login(self.tech)
+        data = self.client.get(reverse("api_board_column", args=["CLOSED"])).json()
+        self.assertEqual(data["html"].strip(), "")
+        response = self.client.get(reverse("api_board_column", args=["BOGUS"]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_column_endpoint_rejects_tampered_cursor(self):
+        for raw in (["next", ["yesterday", 1]], ["next", [None, None]], "garbage"):
+            cursor = base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+            with self.subTest(raw=raw):
+                response = self.client.get(
+                    reverse("api_board_column", args=["CLOSED"]), {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(),
+                                 {"ok": False, "error": "Invalid cursor"})
+
+    def test_move_returns_updated_counters(self):
+        data = self.client.post(
+            reverse("api_move_ticket", args=[self.open_ticket.id]),
+            {"status": "IN_PROGRESS"}).json()
+        self.assertEqual(data["from_status"], "NEW")
+        self.assertEqual(data["to_status"], "IN_PROGRESS")
+        self.assertEqual(data["counts"], {
+            "NEW": 0, "IN_PROGRESS": 1, "RESOLVED": 0, "CLOSED": 7})
+
+
+class RollupTests(TicketTestCase):
+
+    def test_rollups_follow_ticket_writes(self):
+        old = self.make_ticket(age_hours=72, category="NETWORK")
+        t = self.make_ticket(urgency="HIGH")
+        self.make_ticket(category="EMAIL", created_by=self.user2)
+
+        self.client.force_login(self.admin)
+        self.client.post(reverse("ticket_assign", args=[t.id]),
+                         {"technician_id": self.tech.id})
+        self.client.post(reverse("api_move_ticket", args=[t.id]),
+                         {"status": "RESOLVED"})
+        self.client.post(reverse("ticket_status", args=[old.id]),
+                         {"status": "CLOSED"})
+        self.client.post(reverse("ticket_delete", args=[
+            Ticket.objects.get(category="EMAIL").id]))
+
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+        TicketRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=io.StringIO())
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+    def test_rollups_follow_collector_deletes(self):
+        self.make_ticket(category="NETWORK")
+        admin_deleted = self.make_ticket(urgency="HIGH")
+        self.make_ticket(created_by=self.user2)
+        self.make_ticket(created_by=self.user2, assigned_to=self.tech2)
+        self.make_ticket(assigned_to=self.tech2, status="IN_PROGRESS")
+
+        Ticket.objects.filter(category="NETWORK").delete()
+        self.client.force_login(User.objects.create_superuser("root", password="pass"))
+        self.client.post(reverse("admin:tickets_ticket_changelist"), {
+            "action": "delete_selected", "_selected_action": [admin_deleted.id],
+            "post": "yes"})
+        self.user2.delete()  # CASCADE
+        self.tech2.delete()  # SET_NULL
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+        Ticket.objects.all().delete()
+        self.assertEqual(self.rollup_groups(), {})
+
+    def test_analytics_reads_rollups(self):
+        self.make_ticket(assigned_to=self.tech, urgency="CRITICAL")
+        self.make_ticket(assigned_to=self.tech, status="IN_PROGRESS")
+        self.make_ticket(age_hours=24 * 40)
+
+        self.client.force_login(self.tech)
+        context = self.client.get(reverse("analytics")).context
+        self.assertEqual(context["summary"]["total"], 2)
+        self.assertEqual(context["summary"]["critical"], 1)
+        self.assertEqual(
+            {s["status"]: s["count"] for s in context["status_stats"]},
+            {"NEW": 1, "IN_PROGRESS": 1})
+
+        self.client.force_login(self.admin)
+        context = self.client.get(reverse("analytics")).context
+        self.assertEqual(context["summary"]["total"], 3)
+        self.assertEqual(sum(d["count"] for d in context["tickets_by_day"]), 2)
+
+
+class AggregateCacheTests(TicketTestCase):
+
+    def setUp(self):
+        self.ticket = self.make_ticket(assigned_to=self.tech)
+        self.other = self.make_ticket(created_by=self.user2)
+
+    def summary_queries(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard"))
+        aggregates = [q for q in ctx.captured_queries
+                      if 'COUNT("tickets_ticket"."id") AS "total"' in q["sql"]]
+        return response.context["summary"], len(aggregates)
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.summary_queries(self.admin)[1], 1)
+        summary, queries = self.summary_queries(self.admin)
+        self.assertEqual((summary["total"], queries), (2, 0))
+        # Each load reads it twice: the conditional GET validator, then the page
+        self.assertEqual(tickets_cache.stats()["dashboard_summary"],
+                         {"hits": 3, "misses": 1})
+
+    def test_version_bumps_are_safe_on_the_file_cache(self):
+        shared = FileBasedCache(self.enterContext(tempfile.TemporaryDirectory()), {})
+        # Its incr() is a get and a set, which concurrent bumps can interleave
+        with mock.patch("tickets.cache.cache", shared), \
+                mock.patch.object(FileBasedCache, "incr", side_effect=AssertionError):
+            versions = [tickets_cache.get_version("admin")]
+            for _ in range(2):
+                tickets_cache.bump(["admin"])
+                versions.append(tickets_cache.get_version("admin"))
+        self.assertEqual(len(set(versions)), 3)
+
+    def test_view_writes_bump_only_affected_scopes(self):
+        for user in (self.admin, self.tech, self.user, self.user2):
+            self.summary_queries(user)
+
+        self.client.force_login(self.tech)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("ticket_status", args=[self.ticket.id]),
+                             {"status": "IN_PROGRESS"})
+
+        self.assertEqual(self.summary_queries(self.admin)[0]["in_progress"], 1)
+        self.assertEqual(self.summary_queries(self.tech)[0]["in_progress"], 1)
+        self.assertEqual(self.summary_queries(self.user)[0]["in_progress"], 1)
+        self.assertEqual(self.summary_queries(self.user2)[1], 0)
+
+    def test_reassignment_refreshes_previous_assignee(self):
+        self.summary_queries(self.tech)
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("ticket_assign", args=[self.ticket.id]),
+                             {"technician_id": self.tech2.id})
+        self.assertEqual(self.summary_queries(self.tech)[0]["total"], 0)
+
+    def test_entry_expires_at_next_sla_breach(self):
+        self.summary_queries(self.user2)
+        self.assertEqual(self.summary_queries(self.user2)[1], 0)
+
+        later = self.other.sla_due_at + timedelta(seconds=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            summary, queries = self.summary_queries(self.user2)
+        self.assertEqual((summary["overdue"], queries), (1, 1))
+
+
+class ArchiveTests(TicketTestCase):
+
+    def close(self, days_ago, **kwargs):
+        t = self.make_ticket(age_hours=24 * (days_ago + 5), **kwargs)
+        t.status = "CLOSED"
+        t.resolved_at = t.closed_at = timezone.now() - timedelta(days=days_ago)
+        t.save()
+        Comment.objects.create(ticket=t, author=self.user, content="Thanks!")
+        TicketHistory.objects.create(ticket=t, actor=self.admin, action="CLOSED")
+        return t
+
+    def test_moves_old_closed_tickets_with_their_rows(self):
+        old = self.close(400, assigned_to=self.tech)
+        recent = self.close(10)
+        still_open = self.make_ticket(age_hours=24 * 500)
+
+        out = io.StringIO()
+        call_command("archive_tickets", "--days", "365", "--batch-size", "1", stdout=out)
+        self.assertIn("Archived 1 tickets (1 comments, 1 history rows)", out.getvalue())
+
+        self.assertEqual(set(Ticket.objects.values_list("id", flat=True)),
+                         {recent.id, still_open.id})
+        archived = ArchivedTicket.objects.get()
+        self.assertEqual((archived.id, archived.title, archived.assigned_to_id,
+                          archived.closed_at), (old.id, old.title, self.tech.id, old.closed_at))
+        self.assertEqual(ArchivedComment.objects.get().ticket_id, old.id)
+        self.assertEqual(ArchivedTicketHistory.objects.get().ticket_id, old.id)
+        self.assertFalse(Comment.objects.filter(ticket_id=old.id).exists())
+        # Rollups now describe the live tickets only
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+    def test_reopened_ticket_is_not_archived(self):
+        t = self.close(400)
+        before = timezone.now() - timedelta(days=365)
+        Ticket.objects.filter(id=t.id).update(status="IN_PROGRESS")
+        self.assertEqual(list(archive_closed(before)), [])
+        self.assertFalse(ArchivedTicket.objects.exists())
+
+    def test_detail_reads_archived_ticket(self):
+        t = self.close(400, assigned_to=self.tech)
+        list(archive_closed(timezone.now()))
+
+        for user, status in ((self.user, 200), (self.tech, 200),
+                             (self.user2, 403), (self.tech2, 403)):
+            self.client.force_login(user)
+            response = self.client.get(reverse("ticket_detail", args=[t.id]))
+            self.assertEqual(response.status_code, status)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("ticket_detail", args=[t.id]))
+        self.assertContains(response, "Thanks!")
+        self.assertContains(response, "ARCHIVED")
+        self.assertNotContains(response, reverse("ticket_comment", args=[t.id]))
+        self.assertEqual(self.client.get(
+            reverse("ticket_detail", args=[t.id + 100])).status_code, 404)
+
+    def test_export_merges_live_and_archived_in_id_order(self):
+        first = self.close(400)
+        second = self.make_ticket()
+        third = self.close(400)
+        list(archive_closed(timezone.now() - timedelta(days=365)))
+
+        self.client.force_login(self.user)
+        body = b"".join(self.client.get(reverse("export_tickets")).streaming_content)
+        rows = list(csv.reader(io.StringIO(body.decode())))[1:]
+        self.assertEqual([int(row[0]) for row in rows], [first.id, second.id, third.id])
+        self.assertEqual([row[2] for row in rows], ["CLOSED", "NEW", "CLOSED"])
+
+class BulkTicketTests(TicketTestCase):
+
+    def bulk(self, user, ids, **data):
+        self.client.force_login(user)
+        return self.client.post(reverse("api_bulk_tickets"),
+                                {"ticket_ids": ",".join(map(str, ids)), **data})
+
+    def test_status_change_reports_each_ticket(self):
+        mine = self.make_ticket(assigned_to=self.tech, age_hours=30)
+        done = self.make_ticket(assigned_to=self.tech, status="RESOLVED")
+        other = self.make_ticket(assigned_to=self.tech2)
+        before = mine.updated_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.bulk(self.tech, [mine.id, done.id, other.id, 999],
+                             action="status", status="RESOLVED").json()
+
+        self.assertEqual(data["updated"], 1)
+        self.assertEqual(
+            [r["result"] for r in data["results"]],
+            ["updated", "unchanged", "denied", "not_found"])
+        mine.refresh_from_db()
+        self.assertEqual(mine.status, "RESOLVED")
+        self.assertIsNotNone(mine.resolved_at)
+        self.assertGreater(mine.updated_at, before)
+        self.assertEqual(Ticket.objects.get(id=other.id).status, "NEW")
+        self.assertEqual(
+            list(TicketHistory.objects.values_list("ticket", "to_status")),
+            [(mine.id, "RESOLVED")])
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+    def test_assignment_is_admin_only(self):
+        t = self.make_ticket(assigned_to=self.tech)
+        self.assertEqual(self.bulk(self.tech, [t.id], action="assign",
+                                   technician_id=self.tech2.id).status_code, 403)
+        self.assertEqual(self.bulk(self.user, [t.id], action="status",
+                                   status="CLOSED").status_code, 403)
+
+        data = self.bulk(self.admin, [t.id], action="assign",
+                         technician_id=self.tech2.id).json()
+        self.assertEqual(data["results"], [{"ticket_id": t.id, "result": "updated"}])
+        self.assertEqual(Ticket.objects.get(id=t.id).assigned_to, self.tech2)
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+    def test_invalid_requests_are_rejected(self):
+        t = self.make_ticket()
+        for data in ({"action": "status", "status": "BOGUS"},
+                     {"action": "assign", "technician_id": self.user.id},
+                     {"action": "delete"}):
+            self.assertEqual(self.bulk(self.admin, [t.id], **data).status_code, 400)
+        self.assertEqual(self.bulk(self.admin, ["1", "x"], action="status",
+                                   status="CLOSED").status_code, 400)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def queries(count, status):
+            ids = [self.make_ticket(age_hours=24 * i).id for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(reverse("api_bulk_tickets"), {
+                    "ticket_ids": ids, "action": "status", "status": status})
+            return len(ctx.captured_queries)
+
+        self.client.force_login(self.admin)
+        self.assertEqual(queries(3, "IN_PROGRESS"), queries(30, "CLOSED"))
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+
+class ImportTicketsTests(TicketTestCase):
+
+    def run_import(self, name, content, *args):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_tickets", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import_keeps_timestamps_and_derived_data(self):
+        rows = [
+            {"title": "VPN down", "description": "Tunnel drops", "urgency": "critical",
+             "category": "NETWORK", "created_by": "user", "assigned_to": "tech",
+             "status": "RESOLVED", "created_at": "2025-01-10T08:00:00Z",
+             "resolved_at": "2025-01-10T11:00:00Z",
+             "comments": [{"author": "tech", "content": "Rebooted the concentrator"}]},
+            {"title": "Bad status", "created_by": "user", "status": "OPEN"},
+            {"title": "Unknown reporter", "created_by": "nobody"},
+            {"title": "Not a technician", "created_by": "user", "assigned_to": "user2"},
+            {"title": "Mouse", "created_by": "user2"},
+        ]
+        out, err = self.run_import(
+            "legacy.jsonl", "\n".join(json.dumps(row) for row in rows) + "\n",
+            "--batch-size", "1")
+
+        self.assertIn("Imported 2 tickets (3 rows skipped)", out)
+        self.assertIn("rows/s", out)
+        self.assertEqual(err.count("Row "), 3)
+
+        t = Ticket.objects.get(title="VPN down")
+        self.assertEqual((t.urgency, t.assigned_to), ("CRITICAL", self.tech))
+        self.assertEqual(t.created_at.isoformat(), "2025-01-10T08:00:00+00:00")
+        self.assertEqual(t.sla_due_at, t.created_at + timedelta(hours=4))
+        self.assertEqual(t.time_to_resolve, 3.0)
+        self.assertEqual(t.history.get().action, "CREATED")
+        self.assertEqual(t.comments.get().created_at, t.created_at)
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+
+        self.client.force_login(self.admin)
+        found = self.client.get(reverse("dashboard"), {"search": "concentrator"})
+        self.assertEqual([x.id for x in found.context["tickets"]], [t.id])
+
+    def test_rows_with_wrong_types_are_skipped(self):
+        rows = [
+            {"title": 5, "created_by": "user"},
+            {"title": "Dock", "created_by": ["user"]},
+            {"title": "Dock", "created_by": "user", "urgency": 3},
+            {"title": "Dock", "created_by": "user", "created_at": 1736496000},
+            {"title": "Dock", "created_by": "user", "comments": 3},
+            {"title": "Dock", "created_by": "user", "comments": [{"content": 1}]},
+            [1, 2],
+            {"title": "Dock", "created_by": "user"},
+        ]
+        out, err = self.run_import(
+            "legacy.jsonl", "\n".join(json.dumps(row) for row in rows) + "\n")
+
+        self.assertIn("Imported 1 tickets (7 rows skipped)", out)
+        self.assertEqual(err.count("Row "), 7)
+
+    def test_rows_with_inconsistent_timestamps_are_skipped(self):
+        rows = [
+            {"title": "Dock", "created_by": "user", "status": "RESOLVED"},
+            {"title": "Dock", "created_by": "user", "status": "CLOSED",
+             "resolved_at": "2025-01-10T11:00:00Z"},
+            {"title": "Dock", "created_by": "user", "status": "RESOLVED",
+             "created_at": "2025-01-10T08:00:00Z", "resolved_at": "2025-01-09T08:00:00Z"},
+            {"title": "Dock", "created_by": "user", "status": "CLOSED",
+             "created_at": "2025-01-10T08:00:00Z", "closed_at": "2025-01-10T07:59:00Z"},
+            {"title": "Dock", "created_by": "user", "status": "CLOSED",
+             "closed_at": "2025-01-10T08:00:00Z"},
+            {"title": "Closed", "created_by": "user", "status": "CLOSED",
+             "created_at": "2025-01-10T08:00:00Z", "closed_at": "2025-01-10T09:00:00Z"},
+        ]
+        out, err = self.run_import(
+            "legacy.jsonl", "\n".join(json.dumps(row) for row in rows) + "\n")
+
+        self.assertIn("Imported 1 tickets (5 rows skipped)", out)
+        self.assertIn("Row 1: RESOLVED tickets need resolved_at", err)
+        self.assertIn("Row 2: CLOSED tickets need closed_at", err)
+        self.assertIn("Row 3: resolved_at is before created_at", err)
+        self.assertIn("Row 4: closed_at is before created_at", err)
+        self.assertIn("Row 5: closed_at is before created_at", err)
+        self.assertEqual(Ticket.objects.get().title, "Closed")
+
+    def test_bulk_writes_leave_other_saves_alone(self):
+        imported_at = timezone.now() - timedelta(days=30)
+        saved_meanwhile = []
+
+        def save_meanwhile(deltas):
+            # Runs inside write_tickets(), as another thread's save could
+            if not saved_meanwhile:
+                saved_meanwhile.append(Ticket(title="Saved meanwhile", created_by=self.user))
+                saved_meanwhile[0].save()
+
+        with mock.patch.object(TicketRollup, "apply_deltas", side_effect=save_meanwhile):
+            write_tickets([Ticket(title="Imported", created_by=self.user,
+                                  created_at=imported_at)])
+
+        self.assertEqual(Ticket.objects.get(title="Imported").created_at, imported_at)
+        self.assertGreater(saved_meanwhile[0].created_at, imported_at + timedelta(days=29))
+
+    def test_csv_import_resumes_from_row(self):
+        content = (
+            "title,created_by,category,comments\n"
+            "First,user,HARDWARE,\n"
+            "Second,user,SOFTWARE,\"[{\"\"author\"\": \"\"user\"\", "
+            "\"\"content\"\": \"\"Still broken\"\"}]\"\n"
+            "Third,user2,OTHER,\n"
+        )
+        self.run_import("legacy.csv", content, "--resume-from", "2")
+        self.assertEqual(sorted(Ticket.objects.values_list("title", flat=True)),
+                         ["Second", "Third"])
+        self.assertEqual(Comment.objects.get().content, "Still broken")
+        self.assertEqual(TicketHistory.objects.count(), 2)
+
+
+class GenerateDataTests(TicketTestCase):
+
+    def generate(self, seed):
+        call_command("generate_data", "--seed", seed, "--tickets", 60,
+                     "--users", 5, "--technicians", 3, "--batch-size", 25,
+                     stdout=io.StringIO())
+        snapshot = [
+            list(User.objects.filter(username__startswith="gen_").order_by(
+                "id").values_list("username", "password", "role", "date_joined")),
+            list(Ticket.objects.order_by("id").values_list(
+                "title", "category", "status", "urgency", "created_by__username",
+                "assigned_to__username", "created_at", "updated_at",
+                "resolved_at", "closed_at", "sla_due_at")),
+            list(TicketHistory.objects.order_by("id").values_list(
+                "ticket__created_at", "actor__username", "action",
+                "to_status", "created_at")),
+            list(Comment.objects.order_by("id").values_list(
+                "ticket__created_at", "author__username", "content", "created_at")),
+        ]
+        User.objects.filter(username__startswith="gen_").delete()
+        TicketRollup.objects.all().delete()
+        return snapshot
+
+    def test_same_seed_gives_identical_data(self):
+        first = self.generate(7)
+        self.assertEqual(len(first[1]), 60)
+        self.assertEqual(first, self.generate(7))
+        self.assertNotEqual(first[1], self.generate(8)[1])
+
+    def test_generated_rows_are_consistent(self):
+        call_command("generate_data", "--tickets", 200, "--users", 10,
+                     "--technicians", 4, stdout=io.StringIO())
+        self.assertEqual(self.rollup_groups(), self.live_groups())
+        self.assertFalse(Ticket.objects.filter(
+            status__in=["RESOLVED", "CLOSED"], resolved_at__isnull=True).exists())
+        self.assertFalse(Ticket.objects.filter(
+            status="CLOSED", closed_at__lt=F("resolved_at")).exists())
+        self.assertFalse(Ticket.objects.exclude(status="NEW").filter(
+            assigned_to__isnull=True).exists())
+        self.assertEqual(TicketHistory.objects.filter(action="CREATED").count(), 200)
+        self.assertTrue(User.objects.get(username="gen_user000000").check_password("password"))
+
+
+class QueryBudgetTests(TicketTestCase):
+
+    def test_views_stay_within_query_budgets(self):
+        call_command("generate_data", "--tickets", 150, "--users", 5,
+                     "--technicians", 2, stdout=io.StringIO())
+        results = benchmark.run(repeat=1, memory=False)
+
+        self.assertEqual(len(results), len(benchmark.VIEWS) * len(benchmark.ROLES))
+        over = [(r["view"], r["role"], r["queries"])
+                for r in results if r["over_budget"]]
+        self.assertEqual(over, [])
+
+
+class MetricsTests(TicketTestCase):
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.make_ticket(assigned_to=self.tech)
+
+    def scrape(self, **headers):
+        return self.client.get(reverse("metrics"), headers=headers)
+
+    def sample(self, text, name, view):
+        prefix = f'{name}{{view="{view}",worker="{metrics.WORKER}"}} '
+        lines = [line for line in text.splitlines() if line.startswith(prefix)]
+        return float(lines[0][len(prefix):]) if lines else None
+
+    def test_views_are_measured_per_url_name(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse("dashboard"))
+        self.client.get(reverse("dashboard"))
+        b"".join(self.client.get(reverse("export_tickets")).streaming_content)
+
+        text = self.scrape().content.decode()
+        self.assertIn("# TYPE ticketflow_request_duration_seconds histogram", text)
+        self.assertEqual(self.sample(
+            text, "ticketflow_request_duration_seconds_count", "dashboard"), 2)
+        self.assertIn('ticketflow_request_duration_seconds_bucket{view="dashboard",'
+                      f'worker="{metrics.WORKER}",le="+Inf"}} 2', text)
+        self.assertGreater(self.sample(
+            text, "ticketflow_sql_queries_total", "dashboard"), 0)
+        # Export queries run while the response streams, and still count
+        self.assertGreaterEqual(self.sample(
+            text, "ticketflow_sql_queries_total", "export_tickets"), 3)
+
+    def test_slow_queries_are_logged_with_view(self):
+        self.client.force_login(self.tech)
+        with mock.patch("tickets.middleware.SLOW_QUERY_MS", 0), \
+                self.assertLogs("tickets.sql", "WARNING") as logs:
+            self.client.get(reverse("board"))
+        self.assertIn("in board:", logs.output[0])
+
+        self.client.force_login(self.admin)
+        self.assertGreater(self.sample(
+            self.scrape().content.decode(), "ticketflow_slow_queries_total", "board"), 0)
+
+    def test_cache_lookups_are_exported(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse("dashboard"))
+        text = self.scrape().content.decode()
+        prefix = ('ticketflow_cache_lookups_total{name="dashboard_summary",'
+                  'outcome="%s",worker="' + metrics.WORKER + '"} ')
+        self.assertIn(prefix % "misses" + "1", text)
+        self.assertIn(prefix % "hits" + "1", text)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command("cache_stats", stdout=out, stderr=err)
+        self.assertIn("dashboard_summary    hits=1 ", out.getvalue())
+        self.assertIn("/metrics", err.getvalue())
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_endpoint_requires_admin_or_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(Authorization="Bearer nope").status_code, 403)
+        self.assertEqual(self.scrape(Authorization="Bearer s3cret").status_code, 200)
+        self.client.force_login(self.user)
+        self.assertEqual(self.scrape().status_code, 403)
+
+
+class SQLiteConcurrencyTests(TransactionTestCase):
+    """Board moves from many threads against a file database.
+
+    Each thread gets its own Django connection, so the default alias is
+    pointed at a temporary file (the test database lives in memory) and
+    the moves go through the real view, retry_on_lock included.
+    """
+
+    WRITERS = 8
+    MOVES = 10
+
+    def file_database(self, options):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "db.sqlite3")
+        self.enterContext(mock.patch.dict(
+            connections.settings["default"], NAME=path, OPTIONS=options))
+
+        def setup():
+            call_command("migrate", verbosity=0)
+            User.objects.create_user("mover", password="pass", role="admin")
+            for i in range(4):
+                Ticket.objects.create(title=f"Ticket {i}", description="Board move",
+                                      created_by=User.objects.get())
+        self.run_threads([setup])
+
+    def run_threads(self, targets):
+        """Run each target in its own thread; return what any of them raised"""
+        errors = []
+
+        def run(target):
+            try:
+                target()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def query(self, func):
+        """func() evaluated in a thread, on the file database"""
+        result = []
+        errors = self.run_threads([lambda: result.append(func())])
+        if errors:
+            raise errors[0]
+        return result[0]
+
+    def mover(self, n, statuses):
+        def move():
+            client = Client()
+            client.force_login(User.objects.get(username="mover"))
+            ids = list(Ticket.objects.order_by("id").values_list("id", flat=True))
+            for i in range(self.MOVES):
+                response = client.post(
+                    reverse("api_move_ticket", args=[ids[(n + i) % len(ids)]]),
+                    {"status": "IN_PROGRESS" if i % 2 else "NEW"})
+                statuses.append(response.status_code)
+        return move
+
+    def test_production_mode_commits_every_move(self):
+        self.file_database(settings.SQLITE_PRODUCTION_OPTIONS)
+        statuses = []
+        errors = self.run_threads([self.mover(n, statuses) for n in range(self.WRITERS)])
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [200] * self.WRITERS * self.MOVES)
+        self.assertEqual(self.query(TicketHistory.objects.count),
+                         self.WRITERS * self.MOVES)
+
+    def test_move_waits_out_a_held_write_lock(self):
+        # A short busy timeout, so the move's BEGIN IMMEDIATE gives up and
+        # retry_on_lock has to start it again once the lock is released
+        self.file_database({**settings.SQLITE_PRODUCTION_OPTIONS, "timeout": 0.05})
+        ready, locked, retried = threading.Event(), threading.Event(), threading.Event()
+        statuses = []
+
+        def holder():
+            ready.wait(5)
+            with transaction.atomic():
+                Ticket.objects.update(urgency="HIGH")
+                locked.set()
+                retried.wait(5)
+
+        def move():
+            client = Client()
+            client.force_login(User.objects.get(username="mover"))
+            ready.set()
+            locked.wait(5)
+            ticket = Ticket.objects.order_by("id").first()
+            response = client.post(reverse("api_move_ticket", args=[ticket.id]),
+                                   {"status": "RESOLVED"})
+            statuses.append(response.status_code)
+
+        def lock_error(exc):
+            retried.set()
+            return is_lock_error(exc)
+
+        with mock.patch("tickets.db.is_lock_error", side_effect=lock_error) as check:
+            errors = self.run_threads([holder, move])
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [200])
+        self.assertTrue(check.called)
+        self.assertEqual(self.query(lambda: list(Ticket.objects.order_by("id").values_list(
+            "status", "urgency"))), [("RESOLVED", "HIGH")] + [("NEW", "HIGH")] * 3)
+
+
+class RetryOnLockTests(TransactionTestCase):
+
+    def test_locked_write_is_retried_in_a_fresh_transaction(self):
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return "done"
+
+        with mock.patch("tickets.db.time.sleep"):
+            self.assertEqual(write(), "done")
+        self.assertEqual(calls, [True, True])
+
+    def test_other_errors_and_nested_calls_are_not_retried(self):
+        calls = []
+
+        @retry_on_lock
+        def write(message):
+            calls.append(message)
+            raise OperationalError(message)
+
+        with mock.patch("tickets.db.time.sleep"):
+            with self.assertRaisesMessage(OperationalError, "disk I/O error"):
+                write("disk I/O error")
+            with transaction.atomic(), self.assertRaises(OperationalError):
+                write("database is locked")
+        self.assertEqual(calls, ["disk I/O error", "database is locked"])
+
+
+class ReplicaRoutingTests(TicketTestCase):
+
+    def setUp(self):
+        self.ticket = self.make_ticket(assigned_to=self.tech)
+
+    def with_replica(self):
+        stack = ExitStack()
+        for target in ("tickets.routers.replica_alias", "tickets.middleware.replica_alias"):
+            stack.enter_context(mock.patch(target, return_value="replica"))
+        return stack
+
+    def test_router_sends_only_opted_in_reads_to_replica(self):
+        router = routers.ReplicaRouter()
+        with self.with_replica():
+            self.assertIsNone(router.db_for_read(Ticket))
+            with routers.replica_reads():
+                self.assertEqual(router.db_for_read(Ticket), "replica")
+                self.assertEqual(router.db_for_write(Ticket), "default")
+                with routers.pinned_to_primary():
+                    self.assertIsNone(router.db_for_read(Ticket))
+        with routers.replica_reads():
+            self.assertIsNone(router.db_for_read(Ticket))
+
+    def test_heavy_views_opt_in(self):
+        entered = []
+        real = routers.replica_reads
+
+        def spy():
+            entered.append(True)
+            return real()
+
+        self.client.force_login(self.admin)
+        with mock.patch("tickets.views.replica_reads", spy):
+            self.client.get(reverse("dashboard"))
+            self.client.get(reverse("analytics"))
+            self.client.get(reverse("ticket_detail", args=[self.ticket.id]))
+        # dashboard (its validator and the page), analytics
+        self.assertEqual(len(entered), 3)
+
+        with mock.patch("tickets.views.replica_db", return_value="default") as db:
+            self.client.get(reverse("export_tickets"))
+        db.assert_called_once()
+
+    def test_writers_are_pinned_to_primary(self):
+        self.client.force_login(self.tech)
+        with self.with_replica():
+            response = self.client.post(
+                reverse("api_move_ticket", args=[self.ticket.id]), {"status": "IN_PROGRESS"})
+            self.assertIn(PIN_COOKIE, response.cookies)
+
+            seen = []
+            with mock.patch("tickets.views.replica_db",
+                            side_effect=lambda: seen.append(routers.replica_db()) or "default"):
+                self.client.get(reverse("export_tickets"))
+            self.assertEqual(seen, ["default"])
+
+    def test_replica_aggregates_expire_with_max_lag(self):
+        self.client.force_login(self.user)
+        with mock.patch("tickets.cache.reading_replica", return_value=True):
+            self.client.get(reverse("dashboard"))
+        later = timezone.now() + timedelta(seconds=settings.REPLICA_MAX_LAG + 1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.client.get(reverse("dashboard"))
+        self.assertEqual(tickets_cache.stats()["dashboard_summary"]["misses"], 2)
+
+    def test_pinned_clients_skip_replica_aggregates(self):
+        def summary(db):
+            return tickets_cache.cached("dashboard_summary", self.user, lambda: db)
+
+        with self.with_replica(), routers.replica_reads():
+            self.assertEqual(summary("replica"), "replica")
+            with routers.pinned_to_primary():
+                self.assertEqual(summary("default"), "default")
+                self.assertEqual(summary("stale"), "default")
+            self.assertEqual(summary("stale"), "replica")
+
+
+class RefreshReplicaTests(TransactionTestCase):
+
+    def test_refresh_copies_primary_with_backup_api(self):
+        User.objects.create_user("someone", password="pass")
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "replica.sqlite3")
+        call_command("refresh_replica", "--target", path, stdout=io.StringIO())
+        with closing(sqlite3.connect(path)) as replica:
+            usernames = replica.execute("SELECT username FROM users_user").fetchall()
+        self.assertEqual(usernames, [("someone",)])
+
+
+class AsyncViewTests(TicketTestCase):
+
+    def setUp(self):
+        self.ticket = self.make_ticket(assigned_to=self.tech, title="Async printer")
+
+    def test_views_are_async(self):
+        for view in (views.dashboard, views.board, views.ticket_detail,
+                     views.api_move_ticket):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    async def test_login_is_required(self):
+        for url in (reverse("board"), reverse("dashboard"),
+                    reverse("ticket_detail", args=[self.ticket.id])):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response.url.startswith(reverse("login")))
+
+    async def test_move_checks_csrf_and_role(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        url = reverse("api_move_ticket", args=[self.ticket.id])
+        await client.aforce_login(self.tech)
+        response = await client.post(url, {"status": "IN_PROGRESS"})
+        self.assertEqual(response.status_code, 403)
+
+        token = "a" * 32
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        response = await client.post(url, {"status": "IN_PROGRESS"},
+                                     headers={"X-CSRFToken": token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["counts"]["IN_PROGRESS"], 1)
+
+        await client.aforce_login(self.tech2)
+        response = await client.post(url, {"status": "NEW"},
+                                     headers={"X-CSRFToken": token})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual((await Ticket.objects.aget(id=self.ticket.id)).status,
+                         "IN_PROGRESS")
+
+    async def test_pages_render_for_their_roles(self):
+        await self.async_client.aforce_login(self.user)
+        for name, args in (("board", []), ("dashboard", []),
+                           ("ticket_detail", [self.ticket.id])):
+            response = await self.async_client.get(reverse(name, args=args))
+            self.assertContains(response, "Async printer")
+
+        await self.async_client.aforce_login(self.user2)
+        response = await self.async_client.get(
+            reverse("ticket_detail", args=[self.ticket.id]))
+        self.assertEqual(response.status_code, 403)
+
+        await self.async_client.aforce_login(self.tech2)
+        for name in ("board", "dashboard"):
+            response = await self.async_client.get(reverse(name))
+            self.assertNotContains(response, "Async printer")
+
+    async def test_conditional_get_answers_304(self):
+        await self.async_client.aforce_login(self.tech)
+        for name, args in (("board", []), ("dashboard", []),
+                           ("ticket_detail", [self.ticket.id])):
+            url = reverse(name, args=args)
+            etag = (await self.async_client.get(url))["ETag"]
+            response = await self.async_client.get(
+                url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304, name)
+
+
+class LoadTestTests(SimpleTestCase):
+
+    def test_parse_mix(self):
+        self.assertEqual(loadtest.parse_mix("board:3,move"), {"board": 3, "move": 1})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("export:1")
+
+    def test_summarize(self):
+        results = [("board", 200, 0.010), ("board", 200, 0.030),
+                   ("move", 500, 0.020), ("move", None, 1.0)]
+        summary = loadtest.summarize(results, 2.0)
+        self.assertEqual(summary["requests_per_second"], 2.0)
+        self.assertEqual(summary["errors"], 2)
+        self.assertEqual(summary["kinds"]["board"]["p50_ms"], 20.0)
+        self.assertNotIn("detail", summary["kinds"])
+
+
+class TicketEventTests(TicketTestCase):
+
+    def setUp(self):
+        self.broker = events.Broker()
+        self.assertEqual(self.broker.fetch(), [])  # starts from the latest row
+
+    def history(self, ticket, action, **kwargs):
+        return TicketHistory.objects.create(ticket=ticket, actor=self.admin,
+                                            action=action, **kwargs)
+
+    def drain(self, subscription):
+        found = []
+        while not subscription.queue.empty():
+            found.append(subscription.queue.get_nowait())
+        return found
+
+    def test_events_reach_only_scopes_that_see_the_ticket(self):
+        t = self.make_ticket(assigned_to=self.tech, title="Projector")
+        self.history(t, "CREATED", to_status="NEW")
+        self.history(t, "COMMENT_ADDED")
+        self.history(t, "STATUS_CHANGED", from_status="NEW", to_status="IN_PROGRESS")
+
+        subscriptions = {scope: events.Subscription(scope) for scope in (
+            "admin", f"technician:{self.tech.id}", f"technician:{self.tech2.id}",
+            f"user:{self.user.id}", f"user:{self.user2.id}")}
+        self.broker.subscribers.update(subscriptions.values())
+        with self.assertNumQueries(2):  # history and tombstones
+            found = self.broker.fetch()
+        self.broker.publish(found)
+
+        for scope, subscription in subscriptions.items():
+            received = self.drain(subscription)
+            if scope in ("admin", f"technician:{self.tech.id}", f"user:{self.user.id}"):
+                self.assertEqual([e["action"] for e in received],
+                                 ["CREATED", "STATUS_CHANGED"], scope)
+            else:
+                self.assertEqual(received, [], scope)
+        self.assertIn("Projector", found[0][0]["card"])
+        self.assertIn(f'data-ticket="{t.id}"', found[0][0]["row"])
+        self.assertEqual(self.broker.fetch(), [])
+
+    def test_reassigning_away_sends_removed_to_the_previous_technician(self):
+        t = self.make_ticket(assigned_to=self.tech, status="IN_PROGRESS")
+        subscriptions = {user: events.Subscription(f"technician:{user.id}")
+                         for user in (self.tech, self.tech2)}
+        self.broker.subscribers.update(subscriptions.values())
+
+        t.assigned_to = self.tech2
+        t.save()
+        self.history(t, "ASSIGNED")
+        self.broker.publish(self.broker.fetch())
+
+        removed, = self.drain(subscriptions[self.tech])
+        self.assertEqual((removed["action"], removed["reason"], removed["ticket_id"],
+                          removed["status"]), ("REMOVED", "REASSIGNED", t.id, "IN_PROGRESS"))
+        self.assertTrue(events.format_event(removed).startswith(
+            f"id: removed-{TicketTombstone.objects.get().id}\nevent: removed\n"))
+        self.assertEqual([e["action"] for e in self.drain(subscriptions[self.tech2])],
+                         ["ASSIGNED"])
+
+        # Away and back within one poll: events carry the ticket's current
+        # state, so each change reaches its current technician and the last
+        # one puts the card back after the removal
+        for user in (self.tech, self.tech2, self.tech):
+            t.assigned_to = user
+            t.save()
+            self.history(t, "ASSIGNED")
+        self.broker.publish(self.broker.fetch())
+        self.assertEqual([e["action"] for e in self.drain(subscriptions[self.tech])],
+                         ["ASSIGNED", "REMOVED", "ASSIGNED", "ASSIGNED"])
+
+    def test_slow_client_is_told_to_reload(self):
+        subscription = events.Subscription("admin")
+        for i in range(events.QUEUE_SIZE + 1):
+            subscription.offer({"id": i})
+        self.assertEqual(self.drain(subscription), [None])
+
+    async def test_stream_sends_events_to_asgi_clients(self):
+        broker = events.Broker()
+        broker.task = asyncio.get_running_loop().create_future()  # no poller
+        await self.async_client.aforce_login(self.tech)
+        with mock.patch("tickets.views.broker", broker):
+            response = await self.async_client.get(reverse("ticket_events"))
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            chunks = aiter(response.streaming_content)
+            self.assertTrue((await anext(chunks)).startswith(b"retry:"))
+
+            subscription, = broker.subscribers
+            self.assertEqual(subscription.scope, f"technician:{self.tech.id}")
+            broker.publish([({"id": 7, "action": "CREATED"}, {subscription.scope})])
+            self.assertEqual(await anext(chunks),
+                             b'id: 7\nevent: ticket\ndata: {"id": 7, "action": "CREATED"}\n\n')
+        broker.task.cancel()
+
+    async def test_poll_survives_failed_reads(self):
+        broker = events.Broker()
+        subscription = events.Subscription("admin")
+        broker.subscribers.add(subscription)
+        results = [OperationalError("database is locked"),
+                   [({"id": 1, "action": "CREATED"}, {"admin"})], []]
+
+        def fetch():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            if not results:
+                broker.unsubscribe(subscription)  # ends the loop
+            return result
+
+        with mock.patch.object(broker, "fetch", fetch), \
+                mock.patch.object(events, "POLL_SECONDS", 0), \
+                self.assertLogs("tickets.events", "ERROR"):
+            await asyncio.wait_for(broker.poll(), 5)
+        self.assertEqual(subscription.queue.get_nowait()["id"], 1)
+
+    def test_wsgi_requests_get_no_stream(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("ticket_events")).status_code, 204)
+
+
+class DeltaSyncTests(TicketTestCase):
+
+    def sync(self, user, cursor=None):
+        self.client.force_login(user)
+        response = self.client.get(reverse("api_ticket_changes"),
+                                   {"cursor": cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        ids = [row[data["fields"].index("id")] for row in data["changed"]]
+        return ids, data["deleted"], data["cursor"]
+
+    def test_returns_only_changes_since_cursor(self):
+        first = self.make_ticket()
+        second = self.make_ticket()
+        self.make_ticket(created_by=self.user2)
+        ids, deleted, cursor = self.sync(self.user)
+        self.assertEqual((ids, deleted), ([first.id, second.id], []))
+        self.assertEqual(self.sync(self.user, cursor)[:2], ([], []))
+
+        first.urgency = "HIGH"
+        first.save()
+        third = self.make_ticket()
+        self.make_ticket(created_by=self.user2)
+        ids, deleted, cursor = self.sync(self.user, cursor)
+        self.assertEqual(ids, [first.id, third.id])
+        self.assertEqual(self.sync(self.user, cursor)[:2], ([], []))
+
+    def test_removals_are_tombstoned_per_scope(self):
+        moved = self.make_ticket(assigned_to=self.tech)
+        gone = self.make_ticket(assigned_to=self.tech)
+        cursors = {user: self.sync(user)[2] for user in (self.admin, self.tech, self.tech2, self.user)}
+
+        moved.assigned_to = self.tech2
+        moved.save()
+        gone_id = gone.id
+        gone.delete()
+
+        self.assertEqual(self.sync(self.tech, cursors[self.tech])[:2], ([], [moved.id, gone_id]))
+        self.assertEqual(self.sync(self.tech2, cursors[self.tech2])[:2], ([moved.id], []))
+        self.assertEqual(self.sync(self.admin, cursors[self.admin])[:2], ([moved.id], [gone_id]))
+        self.assertEqual(self.sync(self.user, cursors[self.user])[:2], ([moved.id], [gone_id]))
+
+    def test_collector_deletes_leave_tombstones(self):
+        bulk = self.make_ticket(assigned_to=self.tech)
+        admin_deleted = self.make_ticket()
+        orphaned = self.make_ticket(created_by=self.user2)
+        unassigned = self.make_ticket(assigned_to=self.tech2)
+        cursors = {user: self.sync(user)[2] for user in (self.admin, self.tech, self.tech2, self.user)}
+
+        Ticket.objects.filter(id=bulk.id).delete()
+        self.client.force_login(User.objects.create_superuser("root", password="pass"))
+        self.client.post(reverse("admin:tickets_ticket_changelist"), {
+            "action": "delete_selected", "_selected_action": [admin_deleted.id],
+            "post": "yes"})
+        tech2_id = self.tech2.id
+        self.user2.delete()  # CASCADE
+        self.tech2.delete()  # SET_NULL
+
+        self.assertEqual(self.sync(self.admin, cursors[self.admin])[:2],
+                         ([unassigned.id], [bulk.id, admin_deleted.id, orphaned.id]))
+        self.assertEqual(self.sync(self.tech, cursors[self.tech])[:2], ([], [bulk.id]))
+        self.assertEqual(self.sync(self.user, cursors[self.user])[:2],
+                         ([unassigned.id], [bulk.id, admin_deleted.id]))
+        self.assertEqual(
+            list(TicketTombstone.objects.filter(scope=f"technician:{tech2_id}")
+                 .values_list("ticket_id", "reason")),
+            [(unassigned.id, "REASSIGNED")])
+
+    def test_bulk_reassignment_and_archive_leave_tombstones(self):
+        t = self.make_ticket(assigned_to=self.tech)
+        cursor = self.sync(self.tech)[2]
+        self.client.force_login(self.admin)
+        self.client.post(reverse("api_bulk_tickets"), {
+            "action": "assign", "technician_id": self.tech2.id, "ticket_ids": [t.id]})
+        self.assertEqual(self.sync(self.tech, cursor)[1], [t.id])
+
+        cursor = self.sync(self.user)[2]
+        Ticket.objects.filter(id=t.id).update(status="CLOSED", closed_at=timezone.now())
+        list(archive_closed(timezone.now()))
+        self.assertEqual(self.sync(self.user, cursor)[:2], ([], [t.id]))
+        self.assertEqual(TicketTombstone.objects.filter(reason="ARCHIVED").count(), 3)
+
+    def test_pages_through_large_scopes(self):
+        created = [self.make_ticket().id for _ in range(5)]
+        seen, cursor = [], None
+        for _ in range(3):
+            page = sync.changes(Ticket.objects.all(), "admin", cursor, page_size=2)
+            seen += [row[0] for row in page["changed"]]
+            cursor = page["cursor"]
+        self.assertEqual(seen, created)
+        self.assertFalse(page["has_more"])
+
+    def test_small_pages_keep_a_ticket_reassigned_away_and_back(self):
+        others = [self.make_ticket(assigned_to=self.tech) for _ in range(2)]
+        returned = self.make_ticket(assigned_to=self.tech)
+        tickets, scope = views.board_tickets(self.tech), tickets_cache.scope_for_user(self.tech)
+        cursor = sync.changes(tickets, scope)["cursor"]
+
+        for t, assignee in ((others[0], self.tech2), (others[1], self.tech2),
+                            (returned, self.tech2), (returned, self.tech)):
+            t.assigned_to = assignee
+            t.save()
+
+        # A client applying each page, deletions first
+        present = {t.id for t in (*others, returned)}
+        while True:
+            page = sync.changes(tickets, scope, cursor, page_size=1)
+            present -= set(page["deleted"])
+            present |= {row[0] for row in page["changed"]}
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+        self.assertEqual(present, {returned.id})
+
+    def test_rejects_malformed_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("api_ticket_changes"), {"cursor": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_boolean_ids_and_naive_datetimes(self):
+        self.client.force_login(self.user)
+        for raw in (["2024-01-01T00:00:00+00:00", True, 0],
+                    ["2024-01-01T00:00:00+00:00", 1, False],
+                    ["2024-01-01T00:00:00", 1, 0]):
+            cursor = base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+            with self.subTest(raw=raw):
+                response = self.client.get(reverse("api_ticket_changes"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TicketTestCase):
+
+    def setUp(self):
+        self.ticket = self.make_ticket(assigned_to=self.tech)
+        self.other = self.make_ticket(assigned_to=self.tech2)
+
+    def revalidate(self, user, name, args=(), **headers):
+        """Fetch a page, then fetch it again with its validators"""
+        self.client.force_login(user)
+        url = reverse(name, args=args)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return first, lambda: self.client.get(url, headers={
+            "If-None-Match": first["ETag"], **headers})
+
+    def test_unchanged_pages_answer_304_without_rendering(self):
+        for name, args in (("dashboard", ()), ("board", ()),
+                           ("ticket_detail", (self.ticket.id,))):
+            with self.subTest(page=name):
+                first, again = self.revalidate(self.tech, name, args)
+                self.assertIn("Last-Modified", first)
+                self.assertIn("no-cache", first["Cache-Control"])
+                self.assertIn("private", first["Cache-Control"])
+                with self.assertNumQueries(5 if name != "ticket_detail" else 3):
+                    response = again()
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response["ETag"], first["ETag"])
+
+    def test_dashboard_etag_covers_replica_counters(self):
+        # Rendered while the replica still lagged behind a write
+        stale = {"total": 0, "new": 0, "in_progress": 0, "resolved": 0,
+                 "closed": 0, "critical": 0, "overdue": 0}
+        with mock.patch("tickets.views.dashboard_summary", return_value=stale):
+            _, again = self.revalidate(self.tech, "dashboard")
+            self.assertEqual(again().status_code, 304)
+        # The replica caught up: same primary rows, different counters
+        response = again()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["summary"]["total"], 1)
+        self.assertEqual(response.context["summary"]["new"], 1)
+
+    def test_if_modified_since_alone(self):
+        first, _ = self.revalidate(self.tech, "board")
+        response = self.client.get(reverse("board"), headers={
+            "If-Modified-Since": first["Last-Modified"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_in_scope_invalidate(self):
+        _, again = self.revalidate(self.tech, "dashboard")
+        self.other.status = "IN_PROGRESS"
+        self.other.save()
+        self.assertEqual(again().status_code, 304)
+
+        self.ticket.status = "IN_PROGRESS"
+        self.ticket.save()
+        self.assertEqual(again().status_code, 200)
+
+    def test_removals_and_breaches_invalidate(self):
+        _, again = self.revalidate(self.tech, "board")
+        Ticket.objects.filter(id=self.ticket.id).update(
+            sla_due_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(again().status_code, 200)
+
+        _, again = self.revalidate(self.tech, "board")
+        self.ticket.assigned_to = self.tech2
+        self.ticket.save()
+        self.assertEqual(again().status_code, 200)
+
+    def test_detail_sees_comments_and_archiving(self):
+        _, again = self.revalidate(self.user, "ticket_detail", (self.ticket.id,))
+        self.client.post(reverse("ticket_comment", args=[self.ticket.id]),
+                         {"content": "Any news?"})
+        self.assertEqual(again().status_code, 200)
+
+        _, again = self.revalidate(self.user, "ticket_detail", (self.ticket.id,))
+        Ticket.objects.filter(id=self.ticket.id).update(
+            status="CLOSED", closed_at=timezone.now())
+        list(archive_closed(timezone.now()))
+        response = again()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "ARCHIVED")
+
+    def test_validators_are_per_user_and_keep_messages(self):
+        first, _ = self.revalidate(self.admin, "dashboard")
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard"), headers={
+            "If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+
+        _, again = self.revalidate(self.admin, "dashboard")
+        self.client.get(reverse("ticket_delete", args=[self.other.id]))
+        response = again()
+        self.assertContains(response, "Ticket deleted successfully.")
+
+    def test_validators_read_indexes(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("board"))
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if "MAX(" not in query["sql"]:
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plan = " | ".join(row[-1] for row in cursor)
+                self.assertIn("INDEX", plan)
+                self.assertNotIn("SCAN tickets_ticket |", plan + " |")
+
+
+class FragmentCacheTests(TicketTestCase):
+
+    def setUp(self):
+        self.tickets = [self.make_ticket(assigned_to=self.tech, title=f"Row {i}")
+                        for i in range(3)]
+        self.client.force_login(self.admin)
+
+    def rendered(self, name, template):
+        response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return response, [t.name for t in response.templates].count(template)
+
+    def test_only_changed_tickets_are_rendered_again(self):
+        for name, template in (("dashboard", "tickets/dashboard_row.html"),
+                               ("board", "tickets/board_cards.html")):
+            with self.subTest(page=name):
+                cache.clear()
+                self.assertEqual(self.rendered(name, template)[1], 3)
+                response, renders = self.rendered(name, template)
+                self.assertEqual(renders, 0)
+                self.assertContains(response, "Row 2")
+
+                self.tickets[0].urgency = "CRITICAL"
+                self.tickets[0].save()
+                self.assertEqual(self.rendered(name, template)[1], 1)
+
+    def test_renamed_people_are_not_served_stale(self):
+        self.rendered("board", "tickets/board_cards.html")
+        self.tech.username = "renamed"
+        self.tech.save()
+        response, renders = self.rendered("board", "tickets/board_cards.html")
+        self.assertEqual(renders, 3)
+        self.assertContains(response, "renamed")
+
+    def test_column_endpoint_and_events_use_fragments(self):
+        self.rendered("board", "tickets/board_cards.html")
+        history = TicketHistory.objects.create(
+            ticket=self.tickets[1], actor=self.admin, action="CREATED")
+        self.assertIn("Row 1", events.ticket_event(history)["card"])
+        data = self.client.get(reverse("api_board_column", args=["NEW"])).json()
+        self.assertEqual(data["html"].count("data-ticket="), 3)
+
+    def test_benchmark_measures_cold_and_warm(self):
+        cache.set("deployment-entry", 1)
+        results = benchmark.measure_fragments(size=3, repeat=1)
+        self.assertEqual([r["fragment"] for r in results], ["row", "card"])
+        self.assertEqual({r["tickets"] for r in results}, {3})
+        self.assertTrue(all(r[f"{state}_ms_median"] >= 0 for r in results
+                            for state in ("uncached", "cold", "warm")))
+        # It measures against a cache of its own, not the one it runs next to
+        self.assertEqual(cache.get("deployment-entry"), 1)
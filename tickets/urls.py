@@ -25,4 +25,13 @@ urlpatterns = [
 
     path("api/tickets/<int:ticket_id>/move/",
          views.api_move_ticket, name="api_move_ticket"),
+    path("api/tickets/changes/",
+         views.api_ticket_changes, name="api_ticket_changes"),
+    path("api/tickets/bulk/",
+         views.api_bulk_tickets, name="api_bulk_tickets"),
+    path("api/board/<str:status>/",
+         views.api_board_column, name="api_board_column"),
+    path("api/events/", views.ticket_events, name="ticket_events"),
+
+    path("metrics", views.metrics, name="metrics"),
 ]
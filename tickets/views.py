@@ -2,18 +2,55 @@ from django.utils import timezone
 from users.models import User
 import json
 import csv
-from datetime import timedelta, date
-from .models import Ticket, TicketHistory, Comment
-
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
-from django.shortcuts import render, redirect, get_object_or_404
+import heapq
+import hmac
+from collections import Counter
+from datetime import date
+from .models import (
+    ArchivedComment, ArchivedTicket, ArchivedTicketHistory, Comment, Ticket,
+    TicketHistory, TicketRollup, TicketTombstone,
+)
+from .pagination import decode_cursor, get_page_size, key_fields, paginate_tickets
+from .search import search_tickets
+from .db import retry_on_lock
+from .routers import replica_db, replica_reads
+from .metrics import collect, render as render_metrics
+from .cache import (
+    cached, invalidate_scopes, invalidate_ticket, scope_for_user, scopes_for_ticket,
+)
+from .events import broker
+from .conditional import conditional, scope_validator, ticket_validator
+from .fragments import render_fragments
+from .sync import changes as sync_changes
+from .stats import (
+    distributions, duration_breakdowns, next_breach, rollup_scope, rollup_summary,
+    technician_stats, ticket_summary,
+)
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.utils.safestring import mark_safe
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Count, Avg, Q, F
-from django.db.models.functions import TruncDate
+from django.db import transaction
+from django.db.models import Count, Avg, Q, F, Max, Prefetch, Value
+from django.db.models.functions import Coalesce
+
+
+async def current_user(request):
+    """request.auser() for async views.
+
+    The result also replaces the lazy request.user, which templates read
+    and which would otherwise look the user up a second time.
+    """
+    request.user = await request.auser()
+    return request.user
 
 
 @login_required
@@ -22,14 +59,38 @@ def ticket_delete(request, ticket_id):
         return HttpResponseForbidden("Only admins can delete tickets")
 
     t = get_object_or_404(Ticket, id=ticket_id)
+    invalidate_ticket(t)
     t.delete()
     messages.success(request, "Ticket deleted successfully.")
     return redirect("dashboard")
 
 
+def dashboard_summary(user, tickets):
+    """One conditional-aggregation query for every counter, cached per scope"""
+    with replica_reads():
+        return cached(
+            "dashboard_summary", user,
+            lambda: ticket_summary(tickets),
+            valid_until=lambda _: next_breach(tickets),
+        )
+
+
+def scope_page_validator(user):
+    return scope_validator(board_tickets(user), scope_for_user(user))
+
+
+def dashboard_validator(user):
+    parts, modified = scope_page_validator(user)
+    # The counters may come from a lagging replica, or a cache entry computed
+    # from one, so the page is only current while they are unchanged too
+    summary = dashboard_summary(user, board_tickets(user))
+    return (parts, sorted(summary.items())), modified
+
+
 @login_required
-def dashboard(request):
-    u = request.user
+@conditional(dashboard_validator)
+async def dashboard(request):
+    u = await current_user(request)
 
     tickets = Ticket.objects.all()
 
@@ -48,10 +109,17 @@ def dashboard(request):
     if urgency:
         tickets = tickets.filter(urgency=urgency)
 
+    # Ranked full-text search; results are paged on their score
+    page_key = ("created_at", "id")
     if search:
-        tickets = tickets.filter(title__icontains=search)
+        tickets, page_key = search_tickets(tickets, search)
 
-    tickets_list = tickets.order_by("-created_at")
+    page = await sync_to_async(paginate_tickets)(
+        tickets.select_related("created_by", "assigned_to"),
+        cursor=request.GET.get("cursor"),
+        page_size=get_page_size(request.GET.get("page_size")),
+        key=page_key,
+    )
 
     # Calculate summary statistics
     all_tickets = Ticket.objects.all()
@@ -60,17 +128,14 @@ def dashboard(request):
     elif u.role == "user":
         all_tickets = all_tickets.filter(created_by=u)
 
-    summary = {
-        'total': all_tickets.count(),
-        'new': all_tickets.filter(status="NEW").count(),
-        'in_progress': all_tickets.filter(status="IN_PROGRESS").count(),
-        'resolved': all_tickets.filter(status="RESOLVED").count(),
-        'critical': all_tickets.filter(urgency="CRITICAL").count(),
-        'overdue': sum(1 for t in all_tickets.filter(status__in=["NEW", "IN_PROGRESS"]) if t.is_overdue),
-    }
+    summary = await sync_to_async(dashboard_summary)(u, all_tickets)
+    rows = await sync_to_async(render_fragments)("row", page.items)
 
-    return render(request, "tickets/dashboard.html", {
-        "tickets": tickets_list,
+    # Templates read request.user and the session, which are sync-only
+    return await sync_to_async(render)(request, "tickets/dashboard.html", {
+        "tickets": page.items,
+        "rows": rows,
+        "page": page,
         "status": status,
         "urgency": urgency,
         "search": search,
@@ -143,26 +208,58 @@ def ticket_create(request):
             to_status=t.status,
             note="Ticket created"
         )
+        invalidate_ticket(t)
 
         return redirect("ticket_detail", ticket_id=t.id)
 
     return render(request, "tickets/create.html")
 
 
+def detail_queryset(ticket_model, comment_model, history_model):
+    return ticket_model.objects.select_related("created_by", "assigned_to").prefetch_related(
+        Prefetch("comments", queryset=comment_model.objects.select_related(
+            "author").order_by("created_at", "id")),
+        Prefetch("history", queryset=history_model.objects.select_related(
+            "actor").order_by("created_at", "id")),
+    )
+
+
+def detail_validator(user, ticket_id):
+    found = (ticket_validator(Ticket, ticket_id)
+             or ticket_validator(ArchivedTicket, ticket_id))
+    if found is None or user.role != "admin":
+        return found
+    # Admins also get the technician picker
+    parts, modified = found
+    technicians = User.objects.filter(role="technician").aggregate(
+        n=Count("id"), last=Max("id"))
+    return (parts, technicians["n"], technicians["last"]), modified
+
+
 @login_required
-def ticket_detail(request, ticket_id):
-    t = get_object_or_404(Ticket, id=ticket_id)
+@conditional(detail_validator)
+async def ticket_detail(request, ticket_id):
+    user = await current_user(request)
+
+    # Fixed query count: ticket + people, then comments and history in bulk;
+    # tickets not in the live table may have been archived
+    t = await detail_queryset(Ticket, Comment, TicketHistory).filter(id=ticket_id).afirst()
+    if t is None:
+        t = await aget_object_or_404(detail_queryset(
+            ArchivedTicket, ArchivedComment, ArchivedTicketHistory), id=ticket_id)
 
     # Access rules
-    if request.user.role == "user" and t.created_by != request.user:
+    if user.role == "user" and t.created_by_id != user.id:
         return HttpResponseForbidden("Access denied")
-    if request.user.role == "technician" and t.assigned_to != request.user:
+    if user.role == "technician" and t.assigned_to_id != user.id:
         return HttpResponseForbidden("Access denied")
 
-    technicians = User.objects.filter(role="technician").order_by(
-        "username") if request.user.role == "admin" else None
+    technicians = None
+    if user.role == "admin" and not t.is_archived:
+        technicians = [tech async for tech in User.objects.filter(
+            role="technician").order_by("username")]
 
-    return render(request, "tickets/detail.html", {
+    return await sync_to_async(render)(request, "tickets/detail.html", {
         "ticket": t,
         "technicians": technicians
     })
@@ -177,6 +274,7 @@ def ticket_assign(request, ticket_id):
     tech_id = request.POST.get("technician_id")
     tech = get_object_or_404(User, id=tech_id, role="technician")
 
+    previous_assignee_id = t.assigned_to_id
     t.assigned_to = tech
     t.save()
 
@@ -184,11 +282,13 @@ def ticket_assign(request, ticket_id):
         ticket=t, actor=request.user, action="ASSIGNED",
         note=f"Assigned to {tech.username}"
     )
+    invalidate_ticket(t, previous_assignee_id)
 
     return redirect("ticket_detail", ticket_id=t.id)
 
 
 @login_required
+@retry_on_lock
 def ticket_status(request, ticket_id):
     t = get_object_or_404(Ticket, id=ticket_id)
 
@@ -213,6 +313,7 @@ def ticket_status(request, ticket_id):
         ticket=t, actor=request.user, action="STATUS_CHANGED",
         from_status=old_status, to_status=new_status, note="Status updated"
     )
+    invalidate_ticket(t)
 
     return redirect("ticket_detail", ticket_id=t.id)
 
@@ -231,6 +332,7 @@ def ticket_comment(request, ticket_id):
         Comment.objects.create(ticket=t, author=request.user, content=content)
         TicketHistory.objects.create(
             ticket=t, actor=request.user, action="COMMENT_ADDED", note="Comment added")
+        invalidate_ticket(t)
 
     return redirect("ticket_detail", ticket_id=t.id)
 
@@ -254,45 +356,119 @@ def ticket_take(request, ticket_id):
         action="ASSIGNED",
         note="Technician took the ticket"
     )
+    invalidate_ticket(t)
 
     return redirect("ticket_detail", ticket_id=t.id)
 
 
+def board_tickets(user):
+    """Tickets visible on the board for this user's role"""
+    tickets = Ticket.objects.all()
+
+    if user.role == "technician":
+        tickets = tickets.filter(assigned_to=user)
+    elif user.role == "user":
+        tickets = tickets.filter(created_by=user)
+
+    return tickets
+
+
+def board_counts(tickets):
+    """Cards per column, read from the status index in one query"""
+    counts = {key: 0 for key, _ in Ticket.STATUS_CHOICES}
+    for row in tickets.order_by().values("status").annotate(n=Count("id")):
+        counts[row["status"]] = row["n"]
+    return counts
+
+
+def board_column(tickets, status, cursor=None):
+    """One bounded page of a board column, newest first"""
+    return paginate_tickets(
+        tickets.filter(status=status).select_related("assigned_to"),
+        cursor=cursor,
+        page_size=settings.BOARD_COLUMN_SIZE,
+    )
+
+
+def board_columns(tickets):
+    """Every column's count and first page; the rest loads on demand"""
+    counts = board_counts(tickets)
+    columns = []
+    for key, _ in Ticket.STATUS_CHOICES:
+        page = board_column(tickets, key) if counts[key] else None
+        cards = page.items if page else []
+        columns.append({
+            "status": key,
+            "count": counts[key],
+            "cards": cards,
+            "html": mark_safe("".join(render_fragments("card", cards))),
+            "next_cursor": page.next_cursor if page else None,
+        })
+    return columns
+
+
 @login_required
-def board(request):
-    u = request.user
+@conditional(scope_page_validator)
+async def board(request):
+    tickets = board_tickets(await current_user(request))
+    columns = await sync_to_async(board_columns)(tickets)
+    return await sync_to_async(render)(request, "tickets/board.html", {"columns": columns})
 
-    tickets = Ticket.objects.all()
 
-    if u.role == "technician":
-        tickets = tickets.filter(assigned_to=u)
-    elif u.role == "user":
-        tickets = tickets.filter(created_by=u)
+@login_required
+def api_board_column(request, status):
+    if status not in dict(Ticket.STATUS_CHOICES):
+        return JsonResponse({"ok": False, "error": "Invalid status"}, status=400)
+
+    tickets = board_tickets(request.user)
+    cursor = request.GET.get("cursor")
+    # Reject rather than silently restart, or the client would append page one again
+    if cursor and decode_cursor(cursor, fields=key_fields(tickets)) is None:
+        return JsonResponse({"ok": False, "error": "Invalid cursor"}, status=400)
+
+    page = board_column(tickets, status, cursor=cursor)
+
+    return JsonResponse({
+        "ok": True,
+        "status": status,
+        "html": "".join(render_fragments("card", page.items)),
+        "next_cursor": page.next_cursor,
+    })
 
-    cols = {
-        "NEW": tickets.filter(status="NEW").order_by("-created_at"),
-        "IN_PROGRESS": tickets.filter(status="IN_PROGRESS").order_by("-created_at"),
-        "RESOLVED": tickets.filter(status="RESOLVED").order_by("-created_at"),
-        "CLOSED": tickets.filter(status="CLOSED").order_by("-created_at"),
-    }
 
-    return render(request, "tickets/board.html", {"cols": cols})
+@login_required
+def api_ticket_changes(request):
+    """Tickets created, updated or removed in the user's scope since ?cursor="""
+    result = sync_changes(board_tickets(request.user), scope_for_user(request.user),
+                          cursor=request.GET.get("cursor"))
+    if result is None:
+        return JsonResponse({"ok": False, "error": "Invalid cursor"}, status=400)
+    # Polled often by wall displays and bridges, so keep it compact
+    return JsonResponse({"ok": True, **result},
+                        json_dumps_params={"separators": (",", ":")})
 
 
 @login_required
 @require_POST
-def api_move_ticket(request, ticket_id):
+async def api_move_ticket(request, ticket_id):
+    # Transactions are sync-only, so the move itself runs in a worker thread
+    return await sync_to_async(move_ticket)(
+        await current_user(request), ticket_id, request.POST.get("status"))
+
+
+@retry_on_lock
+def move_ticket(user, ticket_id, new_status):
+    """Move a ticket to another board column, as api_move_ticket's response"""
     t = get_object_or_404(Ticket, id=ticket_id)
 
     # access rules
-    if request.user.role == "user" and t.created_by != request.user:
+    if user.role == "user" and t.created_by_id != user.id:
         return JsonResponse({"ok": False, "error": "Access denied"}, status=403)
 
-    if request.user.role == "technician":
-        if t.assigned_to != request.user:
+    if user.role == "technician":
+        if t.assigned_to_id != user.id:
             return JsonResponse({"ok": False, "error": "Access denied"}, status=403)
 
-    new_status = request.POST.get("status")
     if new_status not in ["NEW", "IN_PROGRESS", "RESOLVED", "CLOSED"]:
         return JsonResponse({"ok": False, "error": "Invalid status"}, status=400)
 
@@ -309,153 +485,341 @@ def api_move_ticket(request, ticket_id):
 
     TicketHistory.objects.create(
         ticket=t,
-        actor=request.user,
+        actor=user,
         action="STATUS_CHANGED",
         from_status=old_status,
         to_status=new_status,
         note="Moved on board"
     )
-
-    return JsonResponse({"ok": True})
+    invalidate_ticket(t)
+
+    return JsonResponse({
+        "ok": True,
+        "ticket_id": t.id,
+        "from_status": old_status,
+        "to_status": new_status,
+        "counts": board_counts(board_tickets(user)),
+    })
 
 
 @login_required
-def analytics(request):
-    """Analytics dashboard with comprehensive statistics"""
+async def ticket_events(request):
+    """Server-Sent Events for the tickets in the user's scope"""
+    user = await current_user(request)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream; 204 tells
+        # EventSource not to reconnect, and pages work without live updates
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        broker.stream(broker.subscribe(scope_for_user(user))),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
-    # Base queryset - admins see all, others see their scope
-    tickets = Ticket.objects.all()
-    if request.user.role == "technician":
-        tickets = tickets.filter(assigned_to=request.user)
-    elif request.user.role == "user":
-        tickets = tickets.filter(created_by=request.user)
 
-    # Status distribution
-    status_stats = tickets.values('status').annotate(
-        count=Count('id')).order_by('status')
+BULK_MAX_TICKETS = 1000
+
+
+def parse_ticket_ids(values):
+    """Ticket ids from repeated and/or comma-separated values, in order.
+
+    Returns None if any id is not a number.
+    """
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                return None
+            ids.append(int(part))
+    return list(dict.fromkeys(ids))
 
-    # Urgency distribution
-    urgency_stats = tickets.values('urgency').annotate(
-        count=Count('id')).order_by('urgency')
 
-    # Category distribution
-    category_stats = tickets.values('category').annotate(
-        count=Count('id')).order_by('category')
+@login_required
+@require_POST
+@retry_on_lock
+def api_bulk_tickets(request):
+    """Apply one assignment or status change to a list of tickets.
+
+    Everything happens in one transaction: one UPDATE of the changed
+    tickets, one bulk INSERT of their history rows and one rollup update.
+    Each ticket gets its own result: updated, unchanged, denied or
+    not_found.
+    """
+    if request.user.role not in ["admin", "technician"]:
+        return JsonResponse({"ok": False, "error": "Access denied"}, status=403)
+
+    action = request.POST.get("action")
+    if action == "assign":
+        # Same rule as ticket_assign: only admins assign
+        if request.user.role != "admin":
+            return JsonResponse({"ok": False, "error": "Access denied"}, status=403)
+        tech_id = request.POST.get("technician_id", "")
+        tech = User.objects.filter(
+            id=tech_id, role="technician").first() if tech_id.isdigit() else None
+        if tech is None:
+            return JsonResponse({"ok": False, "error": "Invalid technician"}, status=400)
+        changes = {"assigned_to": tech}
+    elif action == "status":
+        new_status = request.POST.get("status")
+        if new_status not in ["NEW", "IN_PROGRESS", "RESOLVED", "CLOSED"]:
+            return JsonResponse({"ok": False, "error": "Invalid status"}, status=400)
+        changes = {"status": new_status}
+    else:
+        return JsonResponse({"ok": False, "error": "Invalid action"}, status=400)
+
+    ids = parse_ticket_ids(request.POST.getlist("ticket_ids"))
+    if not ids:
+        return JsonResponse({"ok": False, "error": "Invalid ticket ids"}, status=400)
+    if len(ids) > BULK_MAX_TICKETS:
+        return JsonResponse({
+            "ok": False, "error": f"At most {BULK_MAX_TICKETS} tickets per request",
+        }, status=400)
+
+    results = {}
+    with transaction.atomic():
+        found = Ticket.objects.select_for_update().in_bulk(ids)
+        # update() skips save(), so auto_now and rollups are done here
+        now = timezone.now()
+        changed, history, deltas, scopes = [], [], Counter(), set()
+        reassigned = []
+
+        for ticket_id in ids:
+            t = found.get(ticket_id)
+            if t is None:
+                results[ticket_id] = "not_found"
+                continue
+            # Same rule as ticket_status: technicians only touch their own
+            if request.user.role == "technician" and t.assigned_to_id != request.user.id:
+                results[ticket_id] = "denied"
+                continue
+
+            old_key = TicketRollup.key_for(t)
+            previous_assignee_id = t.assigned_to_id
+
+            if action == "assign":
+                if t.assigned_to_id == tech.id:
+                    results[ticket_id] = "unchanged"
+                    continue
+                t.assigned_to = tech
+                if previous_assignee_id:
+                    reassigned.append((t.id, {f"technician:{previous_assignee_id}"}))
+                history.append(TicketHistory(
+                    ticket=t, actor=request.user, action="ASSIGNED",
+                    note=f"Assigned to {tech.username}"))
+            else:
+                if t.status == new_status:
+                    results[ticket_id] = "unchanged"
+                    continue
+                history.append(TicketHistory(
+                    ticket=t, actor=request.user, action="STATUS_CHANGED",
+                    from_status=t.status, to_status=new_status,
+                    note="Bulk status update"))
+                t.status = new_status
+
+            changed.append(t)
+            deltas[old_key] -= 1
+            deltas[TicketRollup.key_for(t)] += 1
+            scopes |= scopes_for_ticket(t, previous_assignee_id)
+            results[ticket_id] = "updated"
+
+        # Every ticket gets the same values, so one UPDATE ... WHERE id IN
+        # covers them all; resolved/closed timestamps are only filled in once
+        if action == "status" and new_status == "RESOLVED":
+            changes["resolved_at"] = Coalesce("resolved_at", Value(now))
+        if action == "status" and new_status == "CLOSED":
+            changes["closed_at"] = Coalesce("closed_at", Value(now))
+        Ticket.objects.filter(id__in=[t.id for t in changed]).update(
+            updated_at=now, **changes)
+        TicketHistory.objects.bulk_create(history, batch_size=500)
+        TicketRollup.apply_deltas(deltas)
+        TicketTombstone.record(reassigned, "REASSIGNED")
+        invalidate_scopes(scopes)
+
+    return JsonResponse({
+        "ok": True,
+        "updated": len(changed),
+        "results": [{"ticket_id": ticket_id, "result": results[ticket_id]}
+                    for ticket_id in ids],
+    })
 
-    # Time-based statistics (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_tickets = tickets.filter(created_at__gte=thirty_days_ago)
 
-    # Tickets created per day (last 30 days)
-    tickets_by_day = recent_tickets.annotate(
-        date=TruncDate('created_at')
-    ).values('date').annotate(count=Count('id')).order_by('date')
+def analytics_aggregates(user, tickets):
+    """Every aggregate on the analytics page for one role scope"""
 
-    # Average resolution time (in hours) for resolved tickets
-    resolved_tickets = tickets.filter(resolved_at__isnull=False)
-    avg_resolution_time = None
-    if resolved_tickets.exists():
-        total_time = sum([t.time_to_resolve or 0 for t in resolved_tickets])
-        avg_resolution_time = round(total_time / resolved_tickets.count(), 2)
+    # Status / urgency / category distributions and tickets per day
+    # (last 30 days), read from the rollup table where possible
+    stats = distributions(user, tickets)
 
-    # Overdue tickets
-    overdue_count = sum(1 for t in tickets.filter(
-        status__in=["NEW", "IN_PROGRESS"]
-    ) if t.is_overdue)
+    # Resolution / close durations (in hours), aggregated in the database
+    # in one grouped query and combined per breakdown
+    resolution_stats, breakdowns = duration_breakdowns(
+        tickets, ('category', 'urgency', 'assigned_to__username'))
+    resolution_breakdowns = [
+        ('Category', breakdowns['category']),
+        ('Urgency', breakdowns['urgency']),
+        ('Technician', breakdowns['assigned_to__username']),
+    ]
 
     # Technician performance (admin only)
     tech_stats = None
-    if request.user.role == "admin":
-        technicians = User.objects.filter(role="technician")
-        tech_stats = []
-        for tech in technicians:
-            tech_tickets = Ticket.objects.filter(assigned_to=tech)
-            resolved = tech_tickets.filter(
-                status__in=["RESOLVED", "CLOSED"]).count()
-            in_progress = tech_tickets.filter(status="IN_PROGRESS").count()
-            tech_stats.append({
-                'technician': tech,
-                'total': tech_tickets.count(),
-                'resolved': resolved,
-                'in_progress': in_progress,
-            })
+    if user.role == "admin":
+        tech_stats = technician_stats()
+
+    # Summary counts
+    if user.role == "user":
+        summary = ticket_summary(tickets)
+    else:
+        summary = rollup_summary(rollup_scope(user), tickets)
+
+    return {
+        **stats,
+        'summary': summary,
+        'resolution_stats': resolution_stats,
+        'resolution_breakdowns': resolution_breakdowns,
+        'tech_stats': tech_stats,
+    }
+
+
+@login_required
+def analytics(request):
+    """Analytics dashboard with comprehensive statistics"""
+
+    # Base queryset - admins see all, others see their scope
+    tickets = Ticket.objects.all()
+    if request.user.role == "technician":
+        tickets = tickets.filter(assigned_to=request.user)
+    elif request.user.role == "user":
+        tickets = tickets.filter(created_by=request.user)
+
+    # Cached per scope until a ticket in it changes or an SLA is breached
+    with replica_reads():
+        aggregates = cached(
+            "analytics", request.user,
+            lambda: analytics_aggregates(request.user, tickets),
+            key_extra=(timezone.localdate(),),
+            valid_until=lambda _: next_breach(tickets),
+        )
 
     # Recent activity
     recent_history = TicketHistory.objects.select_related(
         'ticket', 'actor'
     ).order_by('-created_at')[:10]
 
-    # Summary counts
-    summary = {
-        'total': tickets.count(),
-        'new': tickets.filter(status="NEW").count(),
-        'in_progress': tickets.filter(status="IN_PROGRESS").count(),
-        'resolved': tickets.filter(status="RESOLVED").count(),
-        'closed': tickets.filter(status="CLOSED").count(),
-        'critical': tickets.filter(urgency="CRITICAL").count(),
-        'overdue': overdue_count,
-    }
-
     # Prepare JSON for charts
     import json
     # Convert date objects to strings for JSON serialization
     tickets_by_day_serializable = [
         {**d, 'date': d['date'].isoformat() if hasattr(d['date'],
                                                        'isoformat') else str(d['date'])}
-        for d in tickets_by_day
+        for d in aggregates['tickets_by_day']
     ]
     context = {
-        'summary': summary,
-        'status_stats': list(status_stats),
-        'urgency_stats': list(urgency_stats),
-        'category_stats': list(category_stats),
-        'tickets_by_day': list(tickets_by_day),
-        'avg_resolution_time': avg_resolution_time,
-        'tech_stats': tech_stats,
+        **aggregates,
+        'avg_resolution_time': aggregates['resolution_stats']['resolve_avg'],
         'recent_history': recent_history,
-        'status_stats_json': json.dumps(list(status_stats)),
-        'urgency_stats_json': json.dumps(list(urgency_stats)),
-        'category_stats_json': json.dumps(list(category_stats)),
+        'status_stats_json': json.dumps(aggregates['status_stats']),
+        'urgency_stats_json': json.dumps(aggregates['urgency_stats']),
+        'category_stats_json': json.dumps(aggregates['category_stats']),
         'tickets_by_day_json': json.dumps(tickets_by_day_serializable),
     }
 
     return render(request, "tickets/analytics.html", context)
 
 
-@login_required
-def export_tickets(request):
-    """Export tickets to CSV"""
-    tickets = Ticket.objects.all()
+class Echo:
+    """File-like object whose write() hands the line back to the caller"""
 
-    if request.user.role == "technician":
-        tickets = tickets.filter(assigned_to=request.user)
-    elif request.user.role == "user":
-        tickets = tickets.filter(created_by=request.user)
+    def write(self, value):
+        return value
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="tickets_export.csv"'
 
-    writer = csv.writer(response)
-    writer.writerow([
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(*querysets):
+    """Yield CSV rows for the tickets of every queryset, in id order.
+
+    Each queryset is read as plain tuples in chunks, and the ordered
+    streams are merged, so live and archived tickets come out interleaved.
+    """
+    now = timezone.now()
+
+    yield [
         'ID', 'Title', 'Status', 'Urgency', 'Category',
         'Created By', 'Assigned To', 'Created At', 'Resolved At',
         'Time to Resolve (hours)', 'Is Overdue'
-    ])
-
-    for ticket in tickets:
-        writer.writerow([
-            ticket.id,
-            ticket.title,
-            ticket.status,
-            ticket.urgency,
-            ticket.category,
-            ticket.created_by.username,
-            ticket.assigned_to.username if ticket.assigned_to else 'Unassigned',
-            ticket.created_at.strftime('%Y-%m-%d %H:%M'),
-            ticket.resolved_at.strftime(
-                '%Y-%m-%d %H:%M') if ticket.resolved_at else '',
-            ticket.time_to_resolve if ticket.time_to_resolve else '',
-            'Yes' if ticket.is_overdue else 'No',
-        ])
+    ]
+
+    rows = heapq.merge(*(
+        tickets.order_by("id").values_list(
+            "id", "title", "status", "urgency", "category",
+            "created_by__username", "assigned_to__username",
+            "created_at", "resolved_at", "sla_due_at",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for tickets in querysets
+    ))
+
+    for (pk, title, status, urgency, category, created_by, assigned_to,
+         created_at, resolved_at, sla_due_at) in rows:
+        time_to_resolve = None
+        if resolved_at:
+            time_to_resolve = round(
+                (resolved_at - created_at).total_seconds() / 3600, 2)
+        is_overdue = (status in Ticket.OPEN_STATUSES
+                      and sla_due_at is not None and sla_due_at < now)
+
+        yield [
+            pk,
+            title,
+            status,
+            urgency,
+            category,
+            created_by,
+            assigned_to or 'Unassigned',
+            created_at.strftime('%Y-%m-%d %H:%M'),
+            resolved_at.strftime('%Y-%m-%d %H:%M') if resolved_at else '',
+            time_to_resolve if time_to_resolve else '',
+            'Yes' if is_overdue else 'No',
+        ]
+
+
+@login_required
+def export_tickets(request):
+    """Stream tickets as CSV without holding the export in memory"""
+    scope = {}
+    if request.user.role == "technician":
+        scope = {"assigned_to": request.user}
+    elif request.user.role == "user":
+        scope = {"created_by": request.user}
+
+    # The rows are read while streaming, after this view has returned
+    db = replica_db()
+    tickets = Ticket.objects.using(db).filter(**scope)
+    archived = ArchivedTicket.objects.using(db).filter(**scope)
 
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in export_rows(tickets, archived)),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = 'attachment; filename="tickets_export.csv"'
     return response
+
+
+def metrics(request):
+    """Prometheus metrics of every worker, for admins or the metrics token"""
+    token = getattr(settings, "METRICS_TOKEN", None)
+    authorized = bool(token) and hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not authorized and not (request.user.is_authenticated
+                               and request.user.role == "admin"):
+        return HttpResponseForbidden("Access denied")
+
+    return HttpResponse(render_metrics(collect()),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")